@@ -0,0 +1,139 @@
+import os
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from parallel import DEFAULT_BACKEND, create_executor, default_workers
+from instrument import recording, fail
+from fileio import read_file, write_file_atomic
+
+# Pipeline 3 tahap yang saling tumpang tindih:
+#   baca file (thread I/O) -> transform bytes ke bytes (process pool) -> tulis file (thread I/O)
+# dihubungkan asyncio.Queue berbatas, jadi disk tidak menganggur saat CPU sibuk dan sebaliknya.
+READ_CONCURRENCY = 4   # Pembacaan file bersamaan (cocok untuk network share / disk lambat)
+WRITE_CONCURRENCY = 2  # Penulisan file bersamaan
+
+
+def _transform(func, data, filename):
+    # Dijalankan di worker: timing stage() dari func ikut dikembalikan
+    with recording(filename) as record:
+        try:
+            result = func(data)
+        except Exception as e:
+            fail(filename, e)
+            result = None
+    return result, record
+
+async def _run(func, jobs, executor, io_pool, producer, workers, queue_size, cost, budget, done):
+    loop = asyncio.get_running_loop()
+    read_queue = asyncio.Queue(queue_size)
+    write_queue = asyncio.Queue(queue_size)
+    jobs = iter(jobs)
+    costs = {}
+    used = 0
+    freed = asyncio.Condition()
+
+    async def finish(input_path, output_path, record):
+        nonlocal used
+        done.put_nowait((input_path, (output_path, record)))
+        async with freed:
+            used -= costs.pop(input_path, 0)
+            freed.notify_all()
+
+    async def reader():
+        nonlocal used
+        # next(jobs) di thread producer: hash manifest, preflight dan dedupe tidak memblokir event loop
+        while (job := await loop.run_in_executor(producer, next, jobs, None)) is not None:
+            input_path, output_path = job
+            filename = os.path.basename(input_path)
+            if cost is not None:
+                # Budget memori sama dengan imap_budgeted; job yang melebihi budget sendirian tetap jalan
+                job_cost = await loop.run_in_executor(io_pool, cost, input_path)
+                async with freed:
+                    await freed.wait_for(lambda: budget is None or used == 0 or used + job_cost <= budget)
+                    costs[input_path] = job_cost
+                    used += job_cost
+            start = time.perf_counter()
+            try:
+                data = await loop.run_in_executor(io_pool, read_file, input_path)
+            except OSError as e:
+                fail(filename, e)
+                await finish(input_path, None, {"file": input_path, "stages": {}, "total": 0.0,
+                                                "error": f"{type(e).__name__}: {e}"})
+                continue
+            await read_queue.put((input_path, output_path, data, time.perf_counter() - start))
+
+    async def transformer():
+        while (item := await read_queue.get()) is not None:
+            input_path, output_path, data, read_time = item
+            result, record = await loop.run_in_executor(executor, _transform, func, data,
+                                                        os.path.basename(input_path))
+            del data
+            record["file"] = input_path
+            record["stages"]["open"] = record["stages"].get("open", 0.0) + read_time
+            record["total"] += read_time
+            if result is None:
+                if record["error"] is None:
+                    record["error"] = "Tidak ada output"
+                await finish(input_path, None, record)
+                continue
+            await write_queue.put((input_path, output_path, result, record))
+
+    async def writer():
+        while (item := await write_queue.get()) is not None:
+            input_path, output_path, data, record = item
+            start = time.perf_counter()
+            try:
+                await loop.run_in_executor(io_pool, write_file_atomic, output_path, data)
+            except OSError as e:
+                fail(os.path.basename(input_path), e)
+                record["error"] = f"{type(e).__name__}: {e}"
+                output_path = None
+            elapsed = time.perf_counter() - start
+            record["stages"]["write"] = record["stages"].get("write", 0.0) + elapsed
+            record["total"] += elapsed
+            await finish(input_path, output_path, record)
+
+    readers = [asyncio.create_task(reader()) for _ in range(READ_CONCURRENCY)]
+    transformers = [asyncio.create_task(transformer()) for _ in range(workers)]
+    writers = [asyncio.create_task(writer()) for _ in range(WRITE_CONCURRENCY)]
+    try:
+        await asyncio.gather(*readers)
+        for _ in transformers:
+            await read_queue.put(None)
+        await asyncio.gather(*transformers)
+        for _ in writers:
+            await write_queue.put(None)
+        await asyncio.gather(*writers)
+    finally:
+        for task in readers + transformers + writers:
+            task.cancel()
+        done.put_nowait(None)
+
+def imap_async(func, jobs, backend=DEFAULT_BACKEND, max_workers=None, max_in_flight=None, desc=None,
+               cost=None, budget=None):
+    # jobs: iterable (input_path, output_path); func: bytes sumber -> bytes output, harus bisa di-pickle.
+    # Generator (input_path, (output_path, record)) dalam urutan selesai, format sama dengan imap_budgeted.
+    # jobs ditarik satu per satu di satu thread producer (bukan dihabiskan dulu), jadi hash manifest,
+    # preflight dan dedupe tumpang tindih dengan baca/transform/tulis. cost(input_path)/budget: batas
+    # perkiraan memori semua file yang sedang dibaca/diproses/ditulis (urut datang, tanpa mengisi celah).
+    from tqdm import tqdm
+    max_workers = max_workers or default_workers()
+    queue_size = max_in_flight or max_workers * 2
+    loop = asyncio.new_event_loop()
+    with create_executor(backend, max_workers) as executor, \
+            ThreadPoolExecutor(READ_CONCURRENCY + WRITE_CONCURRENCY) as io_pool, \
+            ThreadPoolExecutor(1) as producer, \
+            tqdm(desc=desc) as progress:
+        done = asyncio.Queue()
+        task = loop.create_task(_run(func, jobs, executor, io_pool, producer, max_workers, queue_size,
+                                     cost, budget, done))
+        try:
+            while (item := loop.run_until_complete(done.get())) is not None:
+                yield item
+                progress.update()
+            loop.run_until_complete(task)
+        finally:
+            if not task.done():
+                task.cancel()
+                loop.run_until_complete(asyncio.gather(task, return_exceptions=True))
+            loop.close()
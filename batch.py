@@ -0,0 +1,119 @@
+import os
+from itertools import tee
+from functools import partial
+from scheduler import imap_budgeted, estimate_peak_bytes, default_memory_budget, MB
+from walker import iter_images
+from manifest import Manifest
+from dedupe import DuplicateFilter
+from preflight import Preflight
+from instrument import Instrumented, RunReport
+from naming import OutputNamer, NAMING_SCHEMES, new_run_timestamp
+from fileio import remove_partials
+
+# Kerangka batch bersama semua pipeline folder:
+#   Manifest (incremental) -> Preflight -> DuplicateFilter -> imap_budgeted / imap_async -> RunReport
+# Pipeline hanya memberi fungsi per file; konstanta batch dibaca dari modul pipeline itu sendiri
+# (yang juga diubah cli lewat parallel.configure). Konstanta yang tidak dimiliki modul memakai default di bawah.
+SETTINGS = {
+    "EXECUTOR_BACKEND": "process",
+    "MAX_WORKERS": None,
+    "INCREMENTAL": True,
+    "DEDUPE": None,
+    "DEDUPE_DISTANCE": 6,
+    "PREFLIGHT": False,
+    "RECURSIVE": False,
+    "MAX_IN_FLIGHT": None,
+    "MEMORY_BUDGET_MB": None,
+    "REPORT_NAME": ".run_report",
+    "ASYNC_IO": False,
+    "NAMING": None,
+    "MAX_DIMENSION": None,
+    "STRIP_RESIZE_MIN_PIXELS": None,
+}
+
+def setting(module, name):
+    return getattr(module, name, SETTINGS[name])
+
+def memory_budget(module):
+    budget_mb = setting(module, "MEMORY_BUDGET_MB")
+    return budget_mb * MB if budget_mb else default_memory_budget()
+
+def process_batch(module, input_folder, output_folder, extensions, params, func, desc,
+                  output_for=None, async_func=None, ext=None, max_dimension=None, output_folders=None):
+    # func(input_path, output) dijalankan di worker; output ditentukan di sini sebelum dispatch:
+    #   NAMING "timestamp"/"hash" -> path dari naming.OutputNamer (satu timestamp per run, ekstensi ext)
+    #   output_for                -> output_for(input_path, folder)
+    #   selain itu                -> folder (fungsi per file menentukan nama sendiri)
+    # folder = output_folder; RECURSIVE: subfolder input dicerminkan di output_folder, jadi a/x.png dan
+    # b/x.png tidak saling timpa.
+    # async_func (bytes -> bytes) dipakai jika modul ASYNC_IO; butuh path output per file (NAMING/output_for).
+    # output_folders: semua folder yang ditulis (mis. subfolder rendition), default [output_folder].
+    from async_pipeline import imap_async
+    recursive = setting(module, "RECURSIVE")
+    for folder in output_folders or [output_folder]:
+        os.makedirs(folder, exist_ok=True)
+        remove_partials(folder)
+    if recursive:
+        for folder, _, _ in os.walk(output_folder):
+            remove_partials(folder)
+
+    def folder_for(path):
+        if not recursive:
+            return output_folder
+        folder = os.path.normpath(os.path.join(output_folder, os.path.relpath(os.path.dirname(path), input_folder)))
+        os.makedirs(folder, exist_ok=True)
+        return folder
+
+    image_files = iter_images(input_folder, extensions, recursive=recursive)
+    workers = setting(module, "MAX_WORKERS")
+    naming = setting(module, "NAMING")
+    cost = partial(estimate_peak_bytes, max_dimension=max_dimension or setting(module, "MAX_DIMENSION"),
+                   strip_min_pixels=setting(module, "STRIP_RESIZE_MIN_PIXELS"))
+
+    with Manifest(output_folder, params) as manifest:
+        namer = None
+        if naming in NAMING_SCHEMES:
+            # Satu timestamp untuk seluruh batch; run yang terputus dilanjutkan dengan timestamp yang sama
+            namer = OutputNamer(output_folder, naming, run_timestamp=manifest.begin_run(new_run_timestamp),
+                                source_hash=manifest.pending_hash, ext=ext)
+            image_files = namer.number(image_files)
+        # Hanya file baru/berubah yang di-encode; sisanya dilewati lewat hash konten
+        checks = Preflight(manifest, setting(module, "PREFLIGHT"), max_workers=workers, budget=memory_budget(module))
+        duplicates = DuplicateFilter(manifest, setting(module, "DEDUPE"), setting(module, "DEDUPE_DISTANCE"),
+                                     max_workers=workers, budget=memory_budget(module))
+        input_files = duplicates.filter(checks.filter(
+            manifest.iter_pending(image_files, skip_done=setting(module, "INCREMENTAL"))))
+
+        input_files, targets = tee(input_files)
+        if namer is not None:
+            outputs = map(namer.output_path, targets)
+        elif output_for is not None:
+            outputs = (output_for(path, folder_for(path)) for path in targets)
+        else:
+            outputs = map(folder_for, targets)
+
+        if async_func is not None and setting(module, "ASYNC_IO"):
+            # Worker hanya menerima dan mengembalikan bytes; memori dibatasi MEMORY_BUDGET_MB yang sama
+            results = imap_async(async_func, zip(input_files, outputs), backend=setting(module, "EXECUTOR_BACKEND"),
+                                 max_workers=workers, max_in_flight=setting(module, "MAX_IN_FLIGHT"), desc=desc,
+                                 cost=cost, budget=memory_budget(module))
+        else:
+            results = imap_budgeted(Instrumented(func), input_files, outputs, cost=cost, budget=memory_budget(module),
+                                    backend=setting(module, "EXECUTOR_BACKEND"), max_workers=workers,
+                                    max_in_flight=setting(module, "MAX_IN_FLIGHT"), desc=desc)
+
+        report = RunReport(params["pipeline"])
+        for path, (output_path, record) in results:
+            manifest.finish(path, output_path)
+            report.add(record)
+        report.skipped = manifest.skipped
+        report.duplicates = duplicates.found
+        report.rejected = checks.rejected
+        if namer is not None:
+            # Hanya dicapai jika batch tidak terputus; run berikutnya memakai timestamp baru
+            manifest.end_run()
+
+    # Laporan per tahap, file paling lambat dan daftar gagal
+    report.write_json(os.path.join(output_folder, setting(module, "REPORT_NAME") + ".json"))
+    report.write_csv(os.path.join(output_folder, setting(module, "REPORT_NAME") + ".csv"))
+    return report
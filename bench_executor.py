@@ -0,0 +1,55 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+from itertools import repeat
+from PIL import Image
+from parallel import run_parallel, default_workers
+from final_resize_and_extract_exif import resize_and_save_with_metadata
+
+# Benchmark throughput process_folder berdasarkan jumlah core dan backend
+IMAGE_COUNT = 32
+IMAGE_SIZE = (2400, 1600)
+
+def make_fixtures(folder, count, size):
+    for i in range(count):
+        # Gradien + noise supaya deflate PNG tidak terlalu mudah
+        image = Image.linear_gradient("L").resize(size).convert("RGB")
+        noise = Image.effect_noise(size, 40 + i).convert("RGB")
+        Image.blend(image, noise, 0.3).save(os.path.join(folder, f"bench_{i:03d}.png"))
+
+def worker_counts():
+    counts, n = [], 1
+    while n < default_workers():
+        counts.append(n)
+        n *= 2
+    counts.append(default_workers())
+    return counts
+
+def run_benchmark(count=IMAGE_COUNT, size=IMAGE_SIZE):
+    work_dir = tempfile.mkdtemp(prefix="bench_executor_")
+    input_folder = os.path.join(work_dir, "in")
+    output_folder = os.path.join(work_dir, "out")
+    os.makedirs(input_folder)
+    os.makedirs(output_folder)
+    try:
+        make_fixtures(input_folder, count, size)
+        image_files = sorted(os.path.join(input_folder, f) for f in os.listdir(input_folder))
+
+        print(f"{'backend':<8} {'workers':>7} {'detik':>8} {'img/s':>8} {'speedup':>8}")
+        for backend in ("thread", "process"):
+            baseline = None
+            for workers in worker_counts():
+                start = time.perf_counter()
+                run_parallel(resize_and_save_with_metadata, image_files, repeat(output_folder),
+                             backend=backend, max_workers=workers, desc=f"{backend} x{workers}")
+                elapsed = time.perf_counter() - start
+                baseline = baseline or elapsed
+                print(f"{backend:<8} {workers:>7} {elapsed:>8.2f} {count / elapsed:>8.2f} {baseline / elapsed:>7.2f}x")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else IMAGE_COUNT
+    run_benchmark(count)
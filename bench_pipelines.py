@@ -0,0 +1,164 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import importlib
+import subprocess
+from PIL import Image, PngImagePlugin
+from xmp_metadata import create_xmp_packet
+
+# Benchmark pipeline resize + metadata dengan fixture sintetis; hasil JSON untuk dibandingkan antar versi
+DEFAULT_SIZES = [1500, 4000, 8000]
+ASPECT_RATIO = 3 / 2
+
+# nama: (module, fungsi folder atau None, fungsi per file, ekstensi input, fungsi per file menerima path output)
+PIPELINES = {
+    "final_resize_and_extract_exif": ("final_resize_and_extract_exif", "process_folder",
+                                      "resize_and_save_with_metadata", (".png",), False),
+    "final_with_timestamp": ("final_with_timestamp", "process_folder",
+                             "resize_and_save_with_metadata", (".png",), True),
+    "resize_exif": ("resize_exif", "process_folder", "resize_png_with_metadata", (".png",), False),
+    "resize_png_with_metadata": ("resize_png_with_metadata", "process_folder",
+                                 "resize_png_with_metadata", (".png",), False),
+    "jpg_timestamp": ("jpg_timestamp", "process_jpeg_folder", "resize_and_save_jpeg", (".jpg", ".jpeg"), True),
+    "resize": ("resize", "process_folder", "resize_image_to_target", (".jpg", ".jpeg", ".png"), False),
+    "resize_image_to_target": ("resize", None, "resize_image_to_target", (".jpg", ".jpeg", ".png"), False),
+    "renditions": ("renditions", "process_folder", "save_renditions", (".jpg", ".jpeg", ".png"), False),
+    "convert": ("convert", "process_folder", "convert_with_metadata", (".jpg", ".jpeg", ".png"), True),
+}
+
+def make_fixture(path, long_side, image_format, with_xmp):
+    size = (long_side, int(long_side / ASPECT_RATIO))
+    # Gradien + noise supaya mirip render asli (tidak terlalu mudah dikompres)
+    image = Image.linear_gradient("L").resize(size).convert("RGB")
+    noise = Image.effect_noise(size, 40).convert("RGB")
+    image = Image.blend(image, noise, 0.3)
+    xmp = create_xmp_packet("Judul benchmark", "Deskripsi benchmark", ["bench", "fixture", "xmp"])
+    if image_format == "PNG":
+        pnginfo = PngImagePlugin.PngInfo()
+        if with_xmp:
+            pnginfo.add_itxt("XML:com.adobe.xmp", xmp, lang="en", tkey="x-default")
+        image.save(path, format="PNG", pnginfo=pnginfo)
+    else:
+        image.save(path, format="JPEG", quality=92, **({"xmp": xmp.encode("utf-8")} if with_xmp else {}))
+
+def make_fixtures(folder, sizes, count=1):
+    for long_side in sizes:
+        for image_format, ext in (("PNG", "png"), ("JPEG", "jpg")):
+            for with_xmp in (True, False):
+                for i in range(count):
+                    name = f"{long_side}px_{'xmp' if with_xmp else 'plain'}_{i:02d}.{ext}"
+                    make_fixture(os.path.join(folder, name), long_side, image_format, with_xmp)
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    index = (len(values) - 1) * fraction
+    low, high = int(index), min(int(index) + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (index - low)
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    # ru_maxrss dalam KB di Linux; pool process dihitung lewat RUSAGE_CHILDREN
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return round(peak / 1024, 1)
+
+def run_pipeline(name, fixture_folder, work_dir):
+    module_name, folder_func, file_func, extensions, named = PIPELINES[name]
+    module = importlib.import_module(module_name)
+    module.INCREMENTAL = False
+
+    inputs = sorted(os.path.join(fixture_folder, f) for f in os.listdir(fixture_folder)
+                    if f.lower().endswith(extensions))
+    input_mb = sum(os.path.getsize(path) for path in inputs) / (1024 * 1024)
+    result = {"pipeline": name, "images": len(inputs), "input_mb": round(input_mb, 2)}
+
+    # Latency per gambar: fungsi per file dipanggil berurutan
+    latency_folder = os.path.join(work_dir, "latency")
+    os.makedirs(latency_folder)
+    latencies = []
+    failures = 0
+    for path in inputs:
+        args = (path, os.path.join(latency_folder, os.path.basename(path))) if named else (path, latency_folder)
+        start = time.perf_counter()
+        # Gagal dihitung per input (fungsi per file mengembalikan None), bukan dari jumlah file output:
+        # satu input bisa menghasilkan beberapa output (renditions)
+        try:
+            if getattr(module, file_func)(*args) is None:
+                failures += 1
+        except Exception:
+            failures += 1
+        latencies.append(time.perf_counter() - start)
+    serial_seconds = sum(latencies)
+    result["failures"] = failures
+    result["latency_p50"] = percentile(latencies, 0.50)
+    result["latency_p95"] = percentile(latencies, 0.95)
+
+    # Throughput: entry point folder (paralel) jika ada, selain itu hasil serial
+    if folder_func:
+        throughput_folder = os.path.join(work_dir, "throughput")
+        start = time.perf_counter()
+        getattr(module, folder_func)(fixture_folder, throughput_folder)
+        seconds = time.perf_counter() - start
+    else:
+        seconds = serial_seconds
+    result["seconds"] = seconds
+    result["images_per_sec"] = len(inputs) / seconds if seconds else None
+    result["mb_per_sec"] = input_mb / seconds if seconds else None
+    result["peak_rss_mb"] = peak_rss_mb()
+    return result
+
+def run_isolated(name, fixture_folder):
+    # Setiap pipeline di proses baru supaya peak RSS tidak tercampur
+    completed = subprocess.run([sys.executable, os.path.abspath(__file__), "--run", name, fixture_folder],
+                               stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True, text=True)
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pipeline resize + metadata")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Sisi terpanjang fixture (px)")
+    parser.add_argument("--count", type=int, default=1, help="Jumlah fixture per kombinasi")
+    parser.add_argument("--pipelines", nargs="+", choices=sorted(PIPELINES), default=sorted(PIPELINES))
+    parser.add_argument("--json", help="Simpan hasil ke file JSON")
+    parser.add_argument("--run", nargs=2, metavar=("PIPELINE", "FIXTURES"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        name, fixture_folder = args.run
+        work_dir = tempfile.mkdtemp(prefix="bench_run_")
+        try:
+            print(json.dumps(run_pipeline(name, fixture_folder, work_dir)))
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+        return
+
+    fixture_folder = tempfile.mkdtemp(prefix="bench_fixtures_")
+    try:
+        make_fixtures(fixture_folder, args.sizes, args.count)
+        results = []
+        print(f"{'pipeline':<32} {'img':>4} {'img/s':>8} {'MB/s':>8} {'p50 s':>8} {'p95 s':>8} {'RSS MB':>8} {'gagal':>5}")
+        for name in args.pipelines:
+            result = run_isolated(name, fixture_folder)
+            results.append(result)
+            print(f"{name:<32} {result['images']:>4} {result['images_per_sec'] or 0:>8.2f} "
+                  f"{result['mb_per_sec'] or 0:>8.2f} {result['latency_p50'] or 0:>8.3f} "
+                  f"{result['latency_p95'] or 0:>8.3f} {result['peak_rss_mb'] or 0:>8.1f} {result['failures']:>5}")
+    finally:
+        shutil.rmtree(fixture_folder, ignore_errors=True)
+
+    if args.json:
+        report = {"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "sizes": args.sizes,
+                  "count": args.count, "cpu_count": os.cpu_count(), "results": results}
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
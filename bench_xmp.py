@@ -0,0 +1,98 @@
+import sys
+import timeit
+import xml.etree.ElementTree as ET
+import xmp_metadata
+from xmp_metadata import extract_xmp_metadata, create_xmp_packet
+
+# Benchmark parser/writer XMP baru vs implementasi DOM lama (disalin di sini sebagai pembanding)
+KEYWORD_COUNT = 50
+REPEAT = 2000
+
+def legacy_extract_xmp_metadata(xmp_content):
+    if isinstance(xmp_content, bytes):
+        xmp_str = xmp_content.decode("utf-8", errors="ignore")
+    else:
+        xmp_str = str(xmp_content)
+
+    try:
+        root = ET.fromstring(xmp_str)
+    except ET.ParseError:
+        return "", "", []
+
+    ns = {
+        'rdf': 'http://www.w3.org/1999/02/22-rdf-syntax-ns#',
+        'dc': 'http://purl.org/dc/elements/1.1/'
+    }
+
+    desc = root.find(".//rdf:Description", ns)
+    if desc is None:
+        return "", "", []
+
+    title_elem = desc.find(".//dc:title/rdf:Alt/rdf:li", ns)
+    title = title_elem.text if title_elem is not None else ""
+
+    desc_elem = desc.find(".//dc:description/rdf:Alt/rdf:li", ns)
+    description = desc_elem.text if desc_elem is not None else ""
+
+    keywords = [li.text for li in desc.findall(".//dc:subject/rdf:Bag/rdf:li", ns)]
+
+    return title, description, keywords
+
+def legacy_create_xmp_packet(title, description, keywords):
+    keyword_tags = "\n".join(f"<rdf:li>{kw}</rdf:li>" for kw in keywords)
+    return f"""<?xpacket begin='' id='W5M0MpCehiHzreSzNTczkc9d'?>
+<x:xmpmeta xmlns:x='adobe:ns:meta/' x:xmptk='Python'>
+<rdf:RDF xmlns:rdf='http://www.w3.org/1999/02/22-rdf-syntax-ns#'>
+  <rdf:Description rdf:about=''
+    xmlns:dc='http://purl.org/dc/elements/1.1/'>
+    <dc:title><rdf:Alt><rdf:li xml:lang='x-default'>{title}</rdf:li></rdf:Alt></dc:title>
+    <dc:description><rdf:Alt><rdf:li xml:lang='x-default'>{description}</rdf:li></rdf:Alt></dc:description>
+    <dc:subject><rdf:Bag>{keyword_tags}</rdf:Bag></dc:subject>
+  </rdf:Description>
+</rdf:RDF>
+</x:xmpmeta>
+<?xpacket end='w'?>"""
+
+def run_benchmark(repeat=REPEAT):
+    keywords = [f"keyword {i}" for i in range(KEYWORD_COUNT)]
+    packet = create_xmp_packet("Judul stock", "Deskripsi stock yang cukup panjang", keywords).encode("utf-8")
+    # Packet unik per iterasi untuk mengukur parse tanpa cache
+    unique_packets = [packet.replace(b"Judul stock", f"Judul {i}".encode()) for i in range(repeat)]
+    assert legacy_extract_xmp_metadata(packet) == extract_xmp_metadata(packet)
+
+    def parse_new_cold():
+        for p in unique_packets:
+            extract_xmp_metadata(p)
+        xmp_metadata._cache.clear()
+
+    # Packet besar ala Photoshop (DocumentAncestors panjang) untuk jalur streaming
+    ancestors = "".join(f"<rdf:li>xmp.did:{i:032x}</rdf:li>" for i in range(5000))
+    big_packet = packet.replace(b"</rdf:Description>", (
+        "</rdf:Description><rdf:Description rdf:about='' xmlns:photoshop='http://ns.adobe.com/photoshop/1.0/'>"
+        f"<photoshop:DocumentAncestors><rdf:Bag>{ancestors}</rdf:Bag></photoshop:DocumentAncestors>"
+        "</rdf:Description>").encode("utf-8"))
+    assert legacy_extract_xmp_metadata(big_packet) == extract_xmp_metadata(big_packet)
+    big_repeat = max(1, repeat // 100)
+
+    def parse_big_new():
+        for _ in range(big_repeat):
+            extract_xmp_metadata(big_packet)
+            xmp_metadata._cache.clear()
+
+    cases = [
+        ("extract lama (ET.fromstring + XPath)", lambda: [legacy_extract_xmp_metadata(p) for p in unique_packets]),
+        ("extract baru (tanpa cache)", parse_new_cold),
+        ("extract lama, packet besar", lambda: [legacy_extract_xmp_metadata(big_packet) for _ in range(big_repeat)]),
+        ("extract baru, packet besar (streaming)", parse_big_new),
+        ("extract baru (packet berulang, cache)", lambda: [extract_xmp_metadata(packet) for _ in range(repeat)]),
+        ("create lama (f-string)", lambda: [legacy_create_xmp_packet("T", "D", keywords) for _ in range(repeat)]),
+        ("create baru (template + escape)", lambda: [create_xmp_packet("T", "D", keywords) for _ in range(repeat)]),
+    ]
+    print(f"{'kasus':<42} {'us/packet':>10}")
+    for name, func in cases:
+        seconds = min(timeit.repeat(func, number=1, repeat=3))
+        count = big_repeat if "besar" in name else repeat
+        print(f"{name:<42} {seconds / count * 1e6:>10.1f}")
+
+if __name__ == "__main__":
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else REPEAT)
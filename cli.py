@@ -0,0 +1,328 @@
+import os
+import sys
+import json
+import argparse
+import importlib
+
+# Satu entry point untuk semua pipeline: python cli.py <subcommand> ...
+# Modul berat (PIL, tqdm, pipeline) baru di-import di dalam handler subcommand,
+# jadi --help dan perintah metadata saja (extract, inject-xmp, index search) start dalam hitungan milidetik.
+
+# (format, metadata, penamaan): (modul, fungsi folder, konstanta tambahan)
+RESIZE_PIPELINES = {
+    ("png", "xmp", "suffix"): ("final_resize_and_extract_exif", "process_folder", {}),
+    ("png", "xmp", "timestamp"): ("final_with_timestamp", "process_folder", {"NAMING": "timestamp"}),
+    ("png", "xmp", "hash"): ("final_with_timestamp", "process_folder", {"NAMING": "hash"}),
+    ("png", "text", "keep"): ("resize_exif", "process_folder", {}),
+    ("png", "title-keywords", "keep"): ("resize_png_with_metadata", "process_folder", {}),
+    ("jpeg", "xmp", "timestamp"): ("jpg_timestamp", "process_jpeg_folder", {"NAMING": "timestamp"}),
+    ("jpeg", "xmp", "hash"): ("jpg_timestamp", "process_jpeg_folder", {"NAMING": "hash"}),
+}
+DEFAULT_NAMING = {"xmp": "timestamp", "text": "keep", "title-keywords": "keep"}
+
+# opsi CLI -> konstanta modul pipeline
+PIPELINE_OPTIONS = {
+    "max_dimension": "MAX_DIMENSION",
+    "quality": "JPEG_QUALITY",
+    "target_mb": "TARGET_FILESIZE_MB",
+    "backend": "EXECUTOR_BACKEND",
+    "workers": "MAX_WORKERS",
+    "max_in_flight": "MAX_IN_FLIGHT",
+    "memory_budget_mb": "MEMORY_BUDGET_MB",
+    "recursive": "RECURSIVE",
+    "png_preset": "PNG_PRESET",
+    "rules": "RULES_FILE",
+    "async_io": "ASYNC_IO",
+    "dedupe": "DEDUPE",
+    "preflight": "PREFLIGHT",
+}
+
+
+def _pipeline_values(parser, module, args, **extra):
+    # Konstanta modul pipeline dari opsi CLI yang diisi
+    values = dict(extra)
+    for option, constant in PIPELINE_OPTIONS.items():
+        value = getattr(args, option, None)
+        if value is None or value is False:
+            continue
+        if not hasattr(module, constant):
+            parser.error(f"--{option.replace('_', '-')} tidak didukung pipeline {module.__name__}")
+        values[constant] = value
+    if getattr(args, "force", False):
+        values["INCREMENTAL"] = False
+    return values
+
+def _configure_pipeline(parser, module, args, **extra):
+    from parallel import configure
+    configure(module, **_pipeline_values(parser, module, args, **extra))
+
+def cmd_resize(parser, args):
+    naming = args.naming or DEFAULT_NAMING[args.metadata]
+    key = (args.format, args.metadata, naming)
+    if key not in RESIZE_PIPELINES:
+        available = ", ".join("/".join(k) for k in RESIZE_PIPELINES)
+        parser.error(f"Kombinasi {'/'.join(key)} tidak tersedia (pilih: {available})")
+    module_name, func_name, constants = RESIZE_PIPELINES[key]
+    module = importlib.import_module(module_name)
+    _configure_pipeline(parser, module, args, **constants)
+    getattr(module, func_name)(args.input, args.output)
+
+def cmd_resize_to_size(parser, args):
+    module = importlib.import_module("resize")
+    # Di resize.py --quality adalah batas atas pencarian kualitas (MAX_QUALITY)
+    extra = {"MAX_QUALITY": args.quality} if args.quality is not None else {}
+    args.quality = None
+    _configure_pipeline(parser, module, args, **extra)
+    module.process_folder(args.input, args.output)
+
+def cmd_convert(parser, args):
+    module = importlib.import_module("convert")
+    # Di convert.py --quality adalah batas atas pencarian kualitas (MAX_QUALITY)
+    extra = {"MAX_QUALITY": args.quality} if args.quality is not None else {}
+    args.quality = None
+    if args.photo_format:
+        extra["PHOTO_FORMAT"] = args.photo_format.upper()
+    if args.target_ssim is not None:
+        extra["TARGET_SSIM"] = args.target_ssim or None
+    _configure_pipeline(parser, module, args, **extra)
+    module.process_folder(args.input, args.output)
+
+def cmd_renditions(parser, args):
+    module = importlib.import_module("renditions")
+    extra = {}
+    if args.renditions:
+        with open(args.renditions, encoding="utf-8") as f:
+            extra["RENDITIONS"] = json.load(f)
+    _configure_pipeline(parser, module, args, **extra)
+    module.process_folder(args.input, args.output)
+
+def cmd_inject_xmp(parser, args):
+    # Ganti XMP tanpa decode pixel: chunk iTXt (PNG) atau segmen APP1 (JPEG) ditulis ulang
+    from xmp_reader import read_header
+    from xmp_metadata import extract_xmp_metadata, create_xmp_packet
+    from fileio import atomic_path
+
+    header = read_header(args.input)
+    title, description, keywords = extract_xmp_metadata(header["xmp"]) if header["xmp"] else ("", "", [])
+    if args.title is not None:
+        title = args.title
+    if args.description is not None:
+        description = args.description
+    if args.keywords is not None:
+        keywords = [kw.strip() for kw in args.keywords.split(",") if kw.strip()]
+    if args.rules:
+        from metadata_rules import load_rules
+        title, description, keywords = load_rules(args.rules).apply(title, description, keywords)
+    xmp = create_xmp_packet(title, description, keywords)
+
+    if header["format"] not in ("PNG", "JPEG"):
+        parser.error(f"{args.input}: bukan PNG atau JPEG")
+    output = args.output or args.input
+    # Tulis ke file sementara lalu rename: sumber tidak terpotong saat dibaca, file sementara dihapus jika gagal
+    with atomic_path(output) as temp_output:
+        if header["format"] == "PNG":
+            from png_chunks import rewrite_png_metadata, itxt_chunk, chunk_keyword
+            keep = None if args.strip else (lambda chunk_type, data: chunk_type not in (b"tEXt", b"zTXt", b"iTXt")
+                                            or chunk_keyword(data) != "XML:com.adobe.xmp")
+            rewrite_png_metadata(args.input, temp_output,
+                                 [itxt_chunk("XML:com.adobe.xmp", xmp, lang="en", tkey="x-default")], keep=keep)
+        else:
+            from xmp_jpeg import copy_jpeg_with_xmp
+            copy_jpeg_with_xmp(args.input, temp_output, xmp)
+    print(f"XMP disimpan ke {output}")
+
+def cmd_extract(parser, args):
+    from xmp_reader import read_header
+    from xmp_metadata import extract_xmp_metadata
+
+    results = []
+    for path in args.files:
+        header = read_header(path, use_mmap=True)
+        title, description, keywords = extract_xmp_metadata(header["xmp"]) if header["xmp"] else ("", "", [])
+        entry = {"file": path, "format": header["format"], "size": header["size"], "mode": header["mode"],
+                 "title": title, "description": description, "keywords": keywords}
+        if args.raw:
+            entry["text"] = header["text"]
+            entry["xmp"] = header["xmp"].decode("utf-8", errors="ignore") if header["xmp"] else None
+        results.append(entry)
+
+    if args.json:
+        json.dump(results, sys.stdout, indent=2, ensure_ascii=False)
+        print()
+        return
+    for entry in results:
+        print(entry["file"])
+        print("  Format:", entry["format"])
+        print("  Ukuran:", entry["size"])
+        print("  Mode warna:", entry["mode"])
+        if entry["title"] or entry["description"] or entry["keywords"]:
+            print("  Judul:", entry["title"])
+            print("  Deskripsi:", entry["description"])
+            print("  Keywords:", entry["keywords"])
+        else:
+            print("  XMP metadata tidak ditemukan.")
+        if args.raw:
+            for key, value in entry["text"].items():
+                print(f"  {key}: {value}")
+            if entry["xmp"]:
+                print(entry["xmp"])
+
+def cmd_index(parser, args):
+    import time
+    import metadata_index
+
+    db_path = args.db or metadata_index.INDEX_DB
+    start = time.perf_counter()
+    if args.index_command == "build":
+        updated, removed = metadata_index.build_index(args.folder, db_path, recursive=not args.no_recursive)
+        print(f"{updated} file diperbarui, {removed} dihapus ({time.perf_counter() - start:.1f} detik)")
+    else:
+        try:
+            rows = metadata_index.search(args.query, db_path, args.limit)
+        except ValueError as e:
+            parser.error(str(e))
+        for path, title, keywords, width, height in rows:
+            print(f"{path}\t{width}x{height}\t{title}\t{keywords}")
+        print(f"{len(rows)} hasil ({(time.perf_counter() - start) * 1000:.1f} ms)", file=sys.stderr)
+
+def cmd_queue(parser, args):
+    import work_queue
+
+    db_path = args.db or work_queue.QUEUE_DB
+    if args.queue_command == "enqueue":
+        module = importlib.import_module(work_queue.QUEUE_PIPELINES[args.pipeline][0])
+        constants = _pipeline_values(parser, module, args)
+        added = work_queue.enqueue_folder(args.input, args.output, args.pipeline, constants, db_path,
+                                          recursive=args.recursive)
+        print(f"{added} job baru di {db_path}")
+    elif args.queue_command == "worker":
+        if args.local:
+            reports = work_queue.run_local_workers(db_path, args.local, args.max_jobs)
+        else:
+            reports = [work_queue.run_worker(db_path, args.worker_id, args.max_jobs)]
+        for report in reports:
+            summary = report.summary()
+            print(f"{summary['processed']} file diproses, {summary['failed']} gagal "
+                  f"({summary['wall_seconds']:.1f} detik)")
+    elif args.queue_command == "retry":
+        with work_queue.WorkQueue(db_path) as queue:
+            print(f"{queue.retry_failed()} job gagal dikembalikan ke pending")
+    with work_queue.WorkQueue(db_path) as queue:
+        print(", ".join(f"{status}: {count}" for status, count in queue.counts().items()))
+        if args.queue_command == "status":
+            for input_path, attempts, error in queue.failures():
+                print(f"  {input_path} ({attempts}x): {error}")
+
+def _add_batch_arguments(parser):
+    parser.add_argument("input", help="Folder input")
+    parser.add_argument("output", help="Folder output")
+    parser.add_argument("--max-dimension", type=int, help="Sisi terpanjang maksimal (px)")
+    parser.add_argument("--quality", type=int, help="Kualitas JPEG")
+    parser.add_argument("--workers", type=int, help="Jumlah worker (default: jumlah core)")
+    parser.add_argument("--backend", choices=("thread", "process"))
+    parser.add_argument("--max-in-flight", type=int, help="Maksimal gambar diproses bersamaan")
+    parser.add_argument("--memory-budget-mb", type=int, help="Batas perkiraan memori semua job")
+    parser.add_argument("--recursive", action="store_true", help="Ikut proses subfolder")
+    parser.add_argument("--force", action="store_true", help="Proses ulang semua file (abaikan manifest)")
+    parser.add_argument("--dedupe", choices=("skip", "flag"),
+                        help="Near-duplicate (perceptual hash) dilewati atau hanya dicatat di laporan")
+    parser.add_argument("--preflight", action="store_true",
+                        help="Tolak gambar kosong/transparan/aspek ekstrem sebelum resize")
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="cli.py", description="Resize gambar + metadata XMP/PNG")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    resize_parser = subparsers.add_parser("resize", help="Resize folder PNG/JPEG dengan metadata")
+    _add_batch_arguments(resize_parser)
+    resize_parser.add_argument("--format", choices=("png", "jpeg"), default="png")
+    resize_parser.add_argument("--metadata", choices=("xmp", "text", "title-keywords"), default="xmp",
+                               help="xmp: XMP dibersihkan aturan; text: semua chunk teks PNG; "
+                                    "title-keywords: hanya Title dan Keywords")
+    resize_parser.add_argument("--naming", choices=("suffix", "timestamp", "hash", "keep"),
+                               help="suffix: nama_rawr.png; timestamp: YYYYMMDD_HHMMSS_001 (satu timestamp per run); "
+                                    "hash: hash konten sumber; keep: nama asli")
+    resize_parser.add_argument("--png-preset", choices=("fast", "balanced", "max"))
+    resize_parser.add_argument("--rules", help="File aturan metadata (JSON)")
+    resize_parser.add_argument("--async", dest="async_io", action="store_true",
+                               help="Baca/encode/tulis tumpang tindih (asyncio)")
+    resize_parser.set_defaults(handler=cmd_resize)
+
+    size_parser = subparsers.add_parser("resize-to-size", help="Resize + cari kualitas JPEG sampai di bawah target MB")
+    _add_batch_arguments(size_parser)
+    size_parser.add_argument("--target-mb", type=float, help="Target ukuran file (MB)")
+    size_parser.set_defaults(handler=cmd_resize_to_size)
+
+    convert_parser = subparsers.add_parser("convert", help="Format per gambar (PNG untuk render flat, JPEG/WebP/AVIF "
+                                                           "untuk foto) + cari kualitas dari SSIM/target MB")
+    _add_batch_arguments(convert_parser)
+    convert_parser.add_argument("--photo-format", choices=("jpeg", "webp", "avif"), help="Format lossy untuk foto")
+    convert_parser.add_argument("--target-ssim", type=float, help="SSIM minimal hasil lossy (0 = pakai --quality)")
+    convert_parser.add_argument("--target-mb", type=float, help="Batas ukuran file (MB)")
+    convert_parser.add_argument("--png-preset", choices=("fast", "balanced", "max"))
+    convert_parser.add_argument("--rules", help="File aturan metadata (JSON)")
+    convert_parser.set_defaults(handler=cmd_convert)
+
+    renditions_parser = subparsers.add_parser("renditions", help="Semua ukuran/format dari satu decode per sumber")
+    _add_batch_arguments(renditions_parser)
+    renditions_parser.add_argument("--renditions", help="File JSON daftar rendition (name, max_dimension, format, "
+                                                        "quality/target_mb)")
+    renditions_parser.add_argument("--png-preset", choices=("fast", "balanced", "max"))
+    renditions_parser.add_argument("--rules", help="File aturan metadata (JSON)")
+    renditions_parser.set_defaults(handler=cmd_renditions)
+
+    inject_parser = subparsers.add_parser("inject-xmp", help="Tulis ulang XMP satu file tanpa encode ulang")
+    inject_parser.add_argument("input")
+    inject_parser.add_argument("output", nargs="?", help="Default: timpa file input")
+    inject_parser.add_argument("--title")
+    inject_parser.add_argument("--description")
+    inject_parser.add_argument("--keywords", help="Dipisah koma")
+    inject_parser.add_argument("--rules", help="Terapkan file aturan metadata (JSON)")
+    inject_parser.add_argument("--strip", action="store_true", help="PNG: buang semua chunk teks lain")
+    inject_parser.set_defaults(handler=cmd_inject_xmp)
+
+    extract_parser = subparsers.add_parser("extract", help="Tampilkan format, ukuran dan metadata XMP")
+    extract_parser.add_argument("files", nargs="+")
+    extract_parser.add_argument("--json", action="store_true")
+    extract_parser.add_argument("--raw", action="store_true", help="Sertakan chunk teks dan packet XMP mentah")
+    extract_parser.set_defaults(handler=cmd_extract)
+
+    index_parser = subparsers.add_parser("index", help="Index metadata SQLite/FTS5 + pencarian keyword")
+    index_parser.add_argument("--db", help="File SQLite index (default: metadata_index.sqlite)")
+    index_subparsers = index_parser.add_subparsers(dest="index_command", required=True)
+    build_parser_ = index_subparsers.add_parser("build", help="Bangun/perbarui index dari folder")
+    build_parser_.add_argument("folder")
+    build_parser_.add_argument("--no-recursive", action="store_true")
+    search_parser = index_subparsers.add_parser("search", help="Cari berdasarkan title/description/keywords")
+    search_parser.add_argument("query")
+    search_parser.add_argument("--limit", type=int, default=50)
+    index_parser.set_defaults(handler=cmd_index)
+
+    queue_parser = subparsers.add_parser("queue", help="Batch terdistribusi: work queue SQLite + worker")
+    queue_parser.add_argument("--db", help="File SQLite work queue (default: work_queue.sqlite)")
+    queue_subparsers = queue_parser.add_subparsers(dest="queue_command", required=True)
+    enqueue_parser = queue_subparsers.add_parser("enqueue", help="Coordinator: daftarkan file folder input")
+    enqueue_parser.add_argument("input", help="Folder input")
+    enqueue_parser.add_argument("output", help="Folder output (harus bisa diakses semua worker)")
+    enqueue_parser.add_argument("--pipeline", choices=("png", "jpeg"), default="png")
+    enqueue_parser.add_argument("--max-dimension", type=int, help="Sisi terpanjang maksimal (px)")
+    enqueue_parser.add_argument("--quality", type=int, help="Kualitas JPEG")
+    enqueue_parser.add_argument("--png-preset", choices=("fast", "balanced", "max"))
+    enqueue_parser.add_argument("--rules", help="File aturan metadata (JSON)")
+    enqueue_parser.add_argument("--recursive", action="store_true", help="Ikut proses subfolder")
+    worker_parser = queue_subparsers.add_parser("worker", help="Lease dan proses job sampai queue habis")
+    worker_parser.add_argument("--local", type=int, metavar="N", help="Jalankan N proses worker di mesin ini")
+    worker_parser.add_argument("--worker-id", help="Default: hostname:pid")
+    worker_parser.add_argument("--max-jobs", type=int, help="Berhenti setelah sekian job (per worker)")
+    queue_subparsers.add_parser("status", help="Jumlah job per status + daftar gagal")
+    queue_subparsers.add_parser("retry", help="Kembalikan job gagal ke pending")
+    queue_parser.set_defaults(handler=cmd_queue)
+    return parser
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    args.handler(parser, args)
+
+if __name__ == "__main__":
+    main()
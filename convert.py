@@ -0,0 +1,257 @@
+import io
+import os
+import sys
+from PIL import Image, PngImagePlugin, features
+from batch import process_batch
+from scheduler import MB
+from xmp_reader import read_xmp
+from xmp_metadata import extract_xmp_metadata, create_xmp_packet
+from metadata_rules import load_rules, DEFAULT_RULES_FILE
+from resizing import target_size, prepare_draft, downscale
+from instrument import stage, fail, warn
+from png_compress import save_png
+from xmp_jpeg import inject_xmp
+from fileio import write_file_atomic
+
+# Output dengan format dipilih per gambar: render flat/grafis (sedikit warna dan entropi rendah) -> PNG lossless
+# selama tidak lebih besar dari kandidat lossy, konten foto -> PHOTO_FORMAT lossy. Kualitas lossy dicari dengan bisection di memori: kualitas terendah yang
+# masih >= TARGET_SSIM, lalu diturunkan lagi jika file melebihi TARGET_FILESIZE_MB. XMP ikut di setiap format.
+MAX_DIMENSION = 7000  # Maksimal panjang/lebar pixel
+PHOTO_FORMAT = "WEBP"        # Format lossy untuk foto: "JPEG", "WEBP" atau "AVIF" (fallback JPEG jika tidak didukung)
+TARGET_SSIM = 0.98           # SSIM minimal hasil lossy terhadap gambar sebelum encode (None = MAX_QUALITY)
+TARGET_FILESIZE_MB = None    # Batas ukuran file (None = tanpa batas); PNG yang melebihi batas dialihkan ke lossy
+MIN_QUALITY = 30
+MAX_QUALITY = 95
+EXECUTOR_BACKEND = "process"  # "thread" atau "process"
+MAX_WORKERS = None           # None = jumlah core CPU
+INCREMENTAL = True           # Lewati file yang sudah tercatat di manifest folder output
+DEDUPE = None                # "skip"/"flag": near-duplicate (perceptual hash) dilewati/dicatat sebelum encode
+DEDUPE_DISTANCE = 6          # Jarak Hamming dHash 64-bit maksimal yang dianggap duplikat
+PREFLIGHT = False            # Tolak gambar kosong/transparan/aspek ekstrem sebelum resize (preflight.py)
+RECURSIVE = False            # Ikut proses subfolder di input_folder
+MAX_IN_FLIGHT = None         # Maksimal gambar yang diproses bersamaan (None = jumlah worker)
+MEMORY_BUDGET_MB = None      # Batas perkiraan memori semua job yang jalan (None = setengah RAM)
+FAST_DOWNSCALE = True        # Draft decode JPEG (DCT scaling) + reducing_gap untuk gambar besar
+REPORT_NAME = ".run_report"  # Laporan run (JSON + CSV) di folder output
+PNG_PRESET = "fast"          # Kompresi PNG: "fast", "balanced" atau "max" (optimize=True lama)
+RULES_FILE = DEFAULT_RULES_FILE  # Banned words, sinonim keyword, batas panjang, dst. (None = tanpa aturan)
+NAMING = "timestamp"         # "timestamp" (YYYYMMDD_HHMMSS_001, satu timestamp per run) atau "hash" (hash konten)
+
+# Probe format: thumbnail NEAREST (tanpa warna campuran di tepi) PROBE_SIZE px
+PROBE_SIZE = 256
+FLAT_MAX_COLORS = 1024       # Warna unik di thumbnail probe; render flat harus di bawah ini...
+FLAT_MAX_ENTROPY = 3.0       # ...dan di bawah entropi histogram luma ini (bit); foto grayscale cuma <= 256 warna
+# SSIM dihitung di mosaic tile resolusi penuh (bukan seluruh gambar) selama pencarian kualitas
+SSIM_TILE = 256
+SSIM_GRID = 3
+SSIM_WINDOW = 7
+WEBP_METHOD = 4              # 0 (cepat) .. 6 (kecil)
+AVIF_SPEED = 6               # 0 (lambat, kecil) .. 10 (cepat)
+
+EXTENSIONS = {"PNG": ".png", "JPEG": ".jpg", "WEBP": ".webp", "AVIF": ".avif"}
+MAX_SIDE = {"WEBP": 16383, "JPEG": 65535}
+FEATURES = {"WEBP": "webp", "AVIF": "avif"}
+
+def probe(image):
+    # Statistik murah untuk memilih format: jumlah warna, entropi luma dan ada tidaknya alpha
+    thumb = image.copy() if max(image.size) <= PROBE_SIZE else image.resize(
+        target_size(image.size, PROBE_SIZE), Image.NEAREST)
+    has_alpha = image.mode in ("RGBA", "LA", "PA") and thumb.getchannel("A").getextrema()[0] < 255
+    colors = thumb.convert("RGBA" if has_alpha else "RGB").getcolors(FLAT_MAX_COLORS)
+    return {"colors": len(colors) if colors else None, "entropy": round(thumb.convert("L").entropy(), 3),
+            "alpha": has_alpha}
+
+def lossy_format(image, has_alpha):
+    fmt = PHOTO_FORMAT
+    if fmt in FEATURES and not features.check(FEATURES[fmt]):
+        fmt = "JPEG"
+    if max(image.size) > MAX_SIDE.get(fmt, max(image.size)):
+        fmt = "JPEG"
+    # JPEG tidak punya alpha
+    return None if fmt == "JPEG" and has_alpha else fmt
+
+def encode(image, fmt, quality, xmp):
+    # Bytes file lengkap dengan XMP; quality diabaikan untuk PNG
+    buffer = io.BytesIO()
+    if fmt == "PNG":
+        pnginfo = PngImagePlugin.PngInfo()
+        pnginfo.add_itxt("XML:com.adobe.xmp", xmp, lang="en", tkey="x-default")
+        save_png(image, buffer, pnginfo, preset=PNG_PRESET)
+        return buffer.getvalue()
+    if fmt == "JPEG":
+        if image.mode not in ("RGB", "L", "CMYK"):
+            image = image.convert("RGB")
+        image.save(buffer, "JPEG", quality=quality, optimize=True)
+        return inject_xmp(buffer.getvalue(), xmp)
+
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "A" in image.mode or "transparency" in image.info else "RGB")
+    options = {"method": WEBP_METHOD} if fmt == "WEBP" else {"speed": AVIF_SPEED}
+    image.save(buffer, fmt, quality=quality, xmp=xmp.encode("utf-8"), **options)
+    data = buffer.getvalue()
+    if xmp.encode("utf-8") not in data:
+        # Pillow lama mengabaikan parameter xmp
+        raise ValueError(f"Pillow tidak menulis XMP ke {fmt}")
+    return data
+
+def _luma(image):
+    import numpy as np
+    return np.asarray(image.convert("L"), dtype=np.float64)
+
+def ssim(reference, image):
+    # SSIM luma dengan window seragam SSIM_WINDOW x SSIM_WINDOW (integral image, tanpa loop pixel)
+    import numpy as np
+    a, b = _luma(reference), _luma(image)
+    k = SSIM_WINDOW
+
+    def window_mean(x):
+        c = np.pad(x, ((1, 0), (1, 0))).cumsum(axis=0).cumsum(axis=1)
+        return (c[k:, k:] - c[:-k, k:] - c[k:, :-k] + c[:-k, :-k]) / (k * k)
+
+    mu_a, mu_b = window_mean(a), window_mean(b)
+    var_a = window_mean(a * a) - mu_a ** 2
+    var_b = window_mean(b * b) - mu_b ** 2
+    covariance = window_mean(a * b) - mu_a * mu_b
+    c1, c2 = (0.01 * 255) ** 2, (0.03 * 255) ** 2
+    value = ((2 * mu_a * mu_b + c1) * (2 * covariance + c2)) / ((mu_a ** 2 + mu_b ** 2 + c1) * (var_a + var_b + c2))
+    return float(value.mean())
+
+def ssim_sample(image):
+    # Mosaic SSIM_GRID x SSIM_GRID tile resolusi penuh tersebar merata (posisi kelipatan 16: batas blok codec)
+    tile = min(SSIM_TILE, image.width, image.height)
+    if image.width <= tile * SSIM_GRID and image.height <= tile * SSIM_GRID:
+        return image
+    mosaic = Image.new(image.mode, (tile * SSIM_GRID, tile * SSIM_GRID))
+    for row in range(SSIM_GRID):
+        for column in range(SSIM_GRID):
+            x = (image.width - tile) * column // max(SSIM_GRID - 1, 1) // 16 * 16
+            y = (image.height - tile) * row // max(SSIM_GRID - 1, 1) // 16 * 16
+            mosaic.paste(image.crop((x, y, x + tile, y + tile)), (column * tile, row * tile))
+    return mosaic
+
+def lowest_passing(passes, low, high):
+    # Nilai terendah di [low, high] dengan passes(q) True, passes monoton naik; None jika tidak ada
+    best = None
+    while low <= high:
+        middle = (low + high) // 2
+        if passes(middle):
+            best, high = middle, middle - 1
+        else:
+            low = middle + 1
+    return best
+
+def search_quality(image, fmt, xmp, target_bytes=None):
+    # (bytes, kualitas, ssim sampel) lossy: kualitas terendah dengan SSIM >= TARGET_SSIM,
+    # lalu kualitas tertinggi di bawahnya yang muat target_bytes
+    quality = MAX_QUALITY
+    sample_ssim = None
+    if TARGET_SSIM is not None:
+        sample = ssim_sample(image)
+        scores = {}
+
+        def good_enough(q):
+            with Image.open(io.BytesIO(encode(sample, fmt, q, xmp))) as decoded:
+                scores[q] = ssim(sample, decoded)
+            return scores[q] >= TARGET_SSIM
+
+        quality = lowest_passing(good_enough, MIN_QUALITY, MAX_QUALITY) or MAX_QUALITY
+        sample_ssim = scores.get(quality)
+
+    encoded = {quality: encode(image, fmt, quality, xmp)}
+    if target_bytes and len(encoded[quality]) > target_bytes:
+        def too_big(q):
+            if q not in encoded:
+                encoded[q] = encode(image, fmt, q, xmp)
+            return len(encoded[q]) > target_bytes
+
+        if too_big(MIN_QUALITY):
+            # Target tidak tercapai: tidak perlu bisection, pemanggil mencatat over_budget
+            quality = MIN_QUALITY
+        else:
+            # Kualitas terendah yang sudah terlalu besar; satu di bawahnya yang dipakai
+            quality = (lowest_passing(too_big, MIN_QUALITY + 1, quality - 1) or quality) - 1
+        sample_ssim = None
+        if quality not in encoded:
+            encoded[quality] = encode(image, fmt, quality, xmp)
+    return encoded[quality], quality, sample_ssim
+
+def convert_image(image, xmp, target_bytes=None):
+    # (bytes, format, info) untuk satu gambar yang sudah di-resize
+    with stage("probe"):
+        info = probe(image)
+    flat = info["colors"] is not None and info["entropy"] < FLAT_MAX_ENTROPY
+    fmt = lossy_format(image, info["alpha"])
+
+    png = None
+    if flat or fmt is None:
+        with stage("encode"):
+            png = encode(image, "PNG", None, xmp)
+        if fmt is None:
+            info["over_budget"] = bool(target_bytes) and len(png) > target_bytes
+            return png, "PNG", info
+
+    with stage("encode"):
+        data, quality, score = search_quality(image, fmt, xmp, target_bytes)
+    if png is not None and len(png) <= len(data):
+        # Probe hanya menebak; PNG dipakai jika memang tidak lebih besar dari kandidat lossy
+        info["over_budget"] = bool(target_bytes) and len(png) > target_bytes
+        return png, "PNG", info
+    info["quality"], info["ssim"] = quality, score
+    info["over_budget"] = bool(target_bytes) and len(data) > target_bytes
+    return data, fmt, info
+
+def convert_with_metadata(input_path, output_path):
+    # output_path dari naming.OutputNamer; ekstensinya diganti sesuai format yang dipilih
+    filename = os.path.basename(input_path)
+
+    try:
+        with stage("metadata_parse"):
+            xmp_data = read_xmp(input_path)
+            title, description, keywords = extract_xmp_metadata(xmp_data) if xmp_data else ("", "", [])
+            title, description, keywords = load_rules(RULES_FILE).apply(title, description, keywords)
+        with stage("metadata_inject"):
+            xmp = create_xmp_packet(title, description, keywords)
+
+        with stage("open"):
+            image = Image.open(input_path)
+        with image:
+            new_size = target_size(image.size, MAX_DIMENSION)
+            with stage("decode"):
+                if new_size and FAST_DOWNSCALE:
+                    prepare_draft(image, new_size)
+                image.load()
+
+            resized = image
+            if new_size:
+                with stage("resize"):
+                    resized = downscale(image, new_size, fast=FAST_DOWNSCALE)
+
+            target_bytes = int(TARGET_FILESIZE_MB * MB) if TARGET_FILESIZE_MB else None
+            data, fmt, info = convert_image(resized, xmp, target_bytes)
+        if info["over_budget"]:
+            # Kualitas minimum (atau PNG untuk alpha tanpa format lossy ber-alpha) masih melebihi target
+            warn(filename, f"{len(data)} byte melebihi target {target_bytes} byte "
+                           f"({fmt}, kualitas {info.get('quality', '-')})")
+
+        output_path = os.path.splitext(output_path)[0] + EXTENSIONS[fmt]
+        with stage("write"):
+            write_file_atomic(output_path, data)
+        return output_path
+
+    except Exception as e:
+        fail(filename, e)
+
+def process_folder(input_folder, output_folder):
+    params = {"pipeline": "auto_format", "max_dimension": MAX_DIMENSION, "photo_format": PHOTO_FORMAT,
+              "target_ssim": TARGET_SSIM, "target_filesize_mb": TARGET_FILESIZE_MB,
+              "quality_range": (MIN_QUALITY, MAX_QUALITY),
+              "png_preset": PNG_PRESET, "fast_downscale": FAST_DOWNSCALE,
+              "rules": load_rules(RULES_FILE).fingerprint, "naming": NAMING}
+    # Nama output ditentukan sebelum dispatch; worker hanya mengganti ekstensi
+    process_batch(sys.modules[__name__], input_folder, output_folder, ('.png', '.jpg', '.jpeg'), params,
+                  convert_with_metadata, desc="Converting Images")
+
+if __name__ == "__main__":
+    input_folder = "sizing"
+    output_folder = "sizing_auto"
+    process_folder(input_folder, output_folder)
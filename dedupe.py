@@ -0,0 +1,170 @@
+import os
+import zlib
+import struct
+from itertools import tee
+from functools import partial
+from PIL import Image
+from resizing import load_reduced, REDUCED_STRIP_MIN_PIXELS
+from scheduler import imap_budgeted, estimate_peak_bytes, default_memory_budget
+
+# Deteksi near-duplicate sebelum encode: dHash 64-bit dari decode kecil (JPEG: draft DCT 1/8, PNG besar per strip),
+# disimpan per hash konten di manifest folder output dan dicari lewat multi-index hashing (jarak Hamming),
+# jadi lookup tetap sublinear walau library berisi ratusan ribu gambar.
+HASH_SIZE = 8          # dHash HASH_SIZE x HASH_SIZE bit
+DRAFT_SIZE = 64        # Ukuran minimal decode draft JPEG sebelum diperkecil ke (HASH_SIZE + 1) x HASH_SIZE
+MAX_DISTANCE = 6       # Jarak Hamming maksimal (dari 64 bit) yang dianggap duplikat
+HASH_BACKEND = "thread"  # Decode/resize Pillow melepas GIL; thread tidak perlu pickle/spawn
+DEDUPE_ACTIONS = ("skip", "flag")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS perceptual_hashes (
+    source_hash TEXT PRIMARY KEY,
+    phash TEXT NOT NULL,
+    source_path TEXT,
+    duplicate_of TEXT
+);
+"""
+
+def dhash(path, hash_size=HASH_SIZE):
+    # Gradien horizontal gambar grayscale (hash_size + 1) x hash_size: 1 bit per pasangan pixel
+    small, _, _ = load_reduced(path, (hash_size + 1, hash_size), "L", draft_size=(DRAFT_SIZE, DRAFT_SIZE))
+    pixels = small.tobytes()
+    value = 0
+    for y in range(hash_size):
+        row = pixels[y * (hash_size + 1):(y + 1) * (hash_size + 1)]
+        for x in range(hash_size):
+            value = (value << 1) | (row[x] > row[x + 1])
+    return value
+
+def hamming(a, b):
+    return (a ^ b).bit_count()
+
+
+class MultiIndexHash:
+    # Multi-index hashing: hash dipecah jadi max_distance + 1 bagian, masing-masing punya tabel exact-match.
+    # Dua hash dengan jarak <= max_distance pasti sama persis di minimal satu bagian (pigeonhole), jadi
+    # pencarian hanya memeriksa kandidat di bucket yang sama, bukan seluruh index.
+    def __init__(self, max_distance=MAX_DISTANCE, bits=HASH_SIZE * HASH_SIZE):
+        self.max_distance = max_distance
+        parts = max_distance + 1
+        widths = [bits // parts + (i < bits % parts) for i in range(parts)]
+        self.fields = []   # (shift, mask) per bagian
+        shift = 0
+        for width in widths:
+            self.fields.append((shift, (1 << width) - 1))
+            shift += width
+        self.tables = [{} for _ in self.fields]
+        self.entries = []  # (hash, item)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, value, item):
+        index = len(self.entries)
+        self.entries.append((value, item))
+        for table, (shift, mask) in zip(self.tables, self.fields):
+            table.setdefault((value >> shift) & mask, []).append(index)
+
+    def search(self, value, max_distance=None):
+        # [(jarak, item)] semua entri dengan jarak <= max_distance, terdekat dulu
+        max_distance = self.max_distance if max_distance is None else max_distance
+        if max_distance > self.max_distance:
+            raise ValueError(f"max_distance {max_distance} > {self.max_distance} (jumlah bagian index)")
+        candidates = set()
+        for table, (shift, mask) in zip(self.tables, self.fields):
+            candidates.update(table.get((value >> shift) & mask, ()))
+        found = []
+        for index in candidates:
+            other, item = self.entries[index]
+            distance = hamming(value, other)
+            if distance <= max_distance:
+                found.append((distance, index, item))
+        return [(distance, item) for distance, _, item in sorted(found, key=lambda entry: entry[:2])]
+
+
+def _hash_job(path, cached):
+    # Dijalankan di worker; None jika gambar tidak bisa di-decode (error dilaporkan pipeline utama)
+    if cached is not None:
+        return cached
+    try:
+        return dhash(path)
+    except (OSError, ValueError, struct.error, zlib.error, Image.DecompressionBombError):
+        return None
+
+class DuplicateFilter:
+    # Saring generator Manifest.iter_pending: file yang mirip gambar yang sudah diproses (run ini atau
+    # sebelumnya) dilewati ("skip") atau hanya dicatat di laporan ("flag"). File pertama dalam urutan menang.
+    def __init__(self, manifest, action=None, max_distance=MAX_DISTANCE, max_workers=None, budget=None):
+        if action not in (None,) + DEDUPE_ACTIONS:
+            raise ValueError(f"DEDUPE tidak dikenal: {action} (pilih {', '.join(DEDUPE_ACTIONS)} atau None)")
+        self.manifest = manifest
+        self.action = action
+        self.max_distance = max_distance
+        self.max_workers = max_workers
+        self.budget = budget or default_memory_budget()
+        self.found = []
+        self.index = MultiIndexHash(max_distance)
+        self._added = set()  # Hash konten yang masuk index di run ini
+        if action:
+            connection = manifest.connection
+            connection.executescript(SCHEMA)
+            for source_hash, phash, source_path in connection.execute(
+                    "SELECT source_hash, phash, source_path FROM perceptual_hashes WHERE duplicate_of IS NULL"):
+                self.index.add(int(phash, 16), (source_hash, source_path))
+
+    def _cached(self, path):
+        with self.manifest.lock:
+            row = self.manifest.connection.execute("SELECT phash FROM perceptual_hashes WHERE source_hash = ?",
+                                                   (self.manifest.pending_hash(path),)).fetchone()
+        return int(row[0], 16) if row else None
+
+    def _store(self, source_hash, phash, path, duplicate_of):
+        # Salinan identik (hash konten sama) tidak boleh menimpa baris gambar aslinya
+        conflict = "IGNORE" if duplicate_of else "REPLACE"
+        with self.manifest.lock:
+            self.manifest.connection.execute(
+                f"INSERT OR {conflict} INTO perceptual_hashes (source_hash, phash, source_path, duplicate_of) "
+                "VALUES (?, ?, ?, ?)", (source_hash, f"{phash:016x}", path, duplicate_of))
+
+    def nearest(self, source_hash, phash):
+        # (jarak, path) gambar terdekat, atau None. Entri dari run sebelumnya dengan hash konten sama adalah
+        # sumber itu sendiri (mis. outputnya dihapus), bukan duplikat; salinan identik di run ini tetap duplikat.
+        for distance, (other_hash, other_path) in self.index.search(phash):
+            if other_hash != source_hash or source_hash in self._added:
+                return distance, other_path
+        return None
+
+    def filter(self, paths):
+        if not self.action:
+            return paths
+        return self._iter_filtered(paths)
+
+    def _iter_filtered(self, paths):
+        # Hash yang sudah tersimpan untuk hash konten yang sama tidak dihitung ulang
+        # Decode dijadwalkan dengan budget memori yang sama dengan pipeline; urutan input dipertahankan
+        paths, lookup = tee(paths)
+        cost = partial(estimate_peak_bytes, max_dimension=DRAFT_SIZE, strip_min_pixels=REDUCED_STRIP_MIN_PIXELS)
+        for path, phash in imap_budgeted(_hash_job, paths, map(self._cached, lookup), cost=cost,
+                                         budget=self.budget, backend=HASH_BACKEND, max_workers=self.max_workers,
+                                         ordered=True, desc="Perceptual hash"):
+            if phash is None:
+                yield path
+                continue
+            source_hash = self.manifest.pending_hash(path)
+            match = self.nearest(source_hash, phash)
+            if match is None:
+                self._store(source_hash, phash, path, None)
+                self.index.add(phash, (source_hash, path))
+                self._added.add(source_hash)
+                yield path
+                continue
+
+            distance, original = match
+            self._store(source_hash, phash, path, original)
+            self.found.append({"file": path, "duplicate_of": original, "distance": distance,
+                               "action": self.action})
+            print(f"Duplicate {os.path.basename(path)} ~ {os.path.basename(original)} (jarak {distance})")
+            if self.action == "flag":
+                yield path
+            else:
+                self.manifest.finish(path, None)
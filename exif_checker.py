@@ -1,16 +1,18 @@
-from PIL import Image
+from xmp_reader import read_header
 
 # Ganti dengan path ke file PNG kamu
 file_path = "sizing/3d (136).png"
 
-# Buka gambar
-with Image.open(file_path) as img:
-    print("Format:", img.format)
-    print("Ukuran:", img.size)
-    print("Mode warna:", img.mode)
-    
-    # Metadata tambahan (jika tersedia)
-    info = img.info
-    print("\nMetadata tambahan:")
-    for key, value in info.items():
-        print(f"{key}: {value}")
+# Baca header gambar (tanpa decode pixel)
+header = read_header(file_path)
+print("Format:", header["format"])
+print("Ukuran:", header["size"])
+print("Mode warna:", header["mode"])
+
+# Metadata tambahan (jika tersedia)
+info = dict(header["text"])
+if header["xmp"] is not None:
+    info["XML:com.adobe.xmp"] = header["xmp"].decode("utf-8", errors="ignore")
+print("\nMetadata tambahan:")
+for key, value in info.items():
+    print(f"{key}: {value}")
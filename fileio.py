@@ -0,0 +1,111 @@
+import os
+import threading
+from contextlib import nullcontext, contextmanager
+
+PARTIAL_MARKER = ".part"
+COPY_BLOCK_SIZE = 1024 * 1024
+
+
+def is_path(target):
+    return isinstance(target, (str, os.PathLike))
+
+def open_file(target, mode="rb"):
+    # Path dibuka (dan ditutup) di sini; file object (mis. BytesIO) dipakai apa adanya.
+    # File object untuk dibaca di-rewind dulu, karena Image.open dll. sudah memajukan posisinya.
+    if is_path(target):
+        return open(target, mode)
+    if "r" in mode:
+        target.seek(0)
+    return nullcontext(target)
+
+def read_file(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+def write_file(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+
+def _fileno(f):
+    try:
+        return f.fileno()
+    except (AttributeError, OSError, ValueError):
+        return None
+
+def _copy_in_kernel(src_fd, dst_fd, src_offset, dst_offset, count):
+    # Byte yang berhasil disalin tanpa lewat memori Python (copy_file_range/sendfile), 0 jika tidak didukung
+    copied = 0
+    try:
+        while copied < count:
+            if hasattr(os, "copy_file_range"):
+                n = os.copy_file_range(src_fd, dst_fd, count - copied, src_offset + copied, dst_offset + copied)
+            else:
+                # sendfile menulis di posisi fd tujuan saat ini
+                os.lseek(dst_fd, dst_offset + copied, os.SEEK_SET)
+                n = os.sendfile(dst_fd, src_fd, src_offset + copied, count - copied)
+            if n == 0:
+                break
+            copied += n
+    except OSError:
+        # Mis. EXDEV (beda filesystem di kernel lama), EINVAL, atau sendfile ke file biasa di macOS
+        pass
+    return copied
+
+def copy_range(src, dst, count=None):
+    # Salin count byte (None = sampai EOF) dari posisi src ke posisi dst, lalu majukan keduanya.
+    # Dua file sungguhan: disalin di kernel (copy_file_range/sendfile); file object lain: read/write per blok.
+    src_offset = src.tell()
+    if count is None:
+        count = src.seek(0, os.SEEK_END) - src_offset
+        src.seek(src_offset)
+    copied = 0
+    src_fd, dst_fd = _fileno(src), _fileno(dst)
+    if src_fd is not None and dst_fd is not None and (hasattr(os, "copy_file_range") or hasattr(os, "sendfile")):
+        dst.flush()
+        dst_offset = dst.tell()
+        copied = _copy_in_kernel(src_fd, dst_fd, src_offset, dst_offset, count)
+        # Posisi file object Python disinkronkan dengan yang ditulis kernel
+        src.seek(src_offset + copied)
+        dst.seek(dst_offset + copied)
+    while copied < count:
+        block = src.read(min(count - copied, COPY_BLOCK_SIZE))
+        if not block:
+            raise ValueError("File sumber terpotong")
+        dst.write(block)
+        copied += len(block)
+    return copied
+
+def partial_path(path):
+    # File sementara di folder yang sama (os.replace harus satu filesystem), ekstensi asli tetap di akhir.
+    # pid + id thread: worker thread yang menulis output yang sama (mis. NAMING "hash") tidak saling timpa
+    folder, filename = os.path.split(path)
+    name, ext = os.path.splitext(filename)
+    return os.path.join(folder, f".{name}.{os.getpid()}-{threading.get_ident()}{PARTIAL_MARKER}{ext}")
+
+@contextmanager
+def atomic_path(path):
+    # Tulis ke path sementara lalu rename: run yang crash tidak pernah meninggalkan PNG/JPEG setengah jadi
+    temp_path = partial_path(path)
+    try:
+        yield temp_path
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+def write_file_atomic(path, data):
+    with atomic_path(path) as temp_path:
+        write_file(temp_path, data)
+
+def remove_partials(folder):
+    # Sisa file sementara dari run sebelumnya yang mati di tengah jalan
+    removed = 0
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            if entry.name.startswith(".") and PARTIAL_MARKER + "." in entry.name and entry.is_file():
+                os.remove(entry.path)
+                removed += 1
+    return removed
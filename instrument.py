@@ -0,0 +1,158 @@
+import io
+import csv
+import sys
+import json
+import time
+import importlib
+import threading
+from contextlib import contextmanager
+
+STAGES = ("open", "metadata_parse", "decode", "resize", "encode", "metadata_inject", "write")
+# Batas atas bucket histogram (detik), bucket terakhir untuk sisanya
+HISTOGRAM_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SLOWEST_COUNT = 10
+
+_local = threading.local()
+
+@contextmanager
+def stage(name):
+    # Catat waktu satu tahap ke record file yang sedang diproses (jika ada)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record = getattr(_local, "record", None)
+        if record is not None:
+            record["stages"][name] = record["stages"].get(name, 0.0) + time.perf_counter() - start
+
+@contextmanager
+def recording(file):
+    # Record timing untuk satu file; stage() dan fail() di thread ini menulis ke record ini
+    record = {"file": file, "stages": {}, "error": None}
+    _local.record = record
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record["total"] = time.perf_counter() - start
+        _local.record = None
+
+def fail(filename, error):
+    # Pengganti print error: tetap dicetak, tapi alasan gagal ikut masuk run report
+    print(f"Error processing {filename}: {error}")
+    record = getattr(_local, "record", None)
+    if record is not None:
+        record["error"] = f"{type(error).__name__}: {error}"
+
+def warn(filename, message):
+    # File tetap berhasil, tapi ada yang perlu dilihat (mis. target ukuran tidak tercapai); masuk run report
+    print(f"Warning {filename}: {message}")
+    record = getattr(_local, "record", None)
+    if record is not None:
+        record.setdefault("warnings", []).append(message)
+
+
+class Instrumented:
+    # Bungkus fungsi per file: hasilnya (hasil asli, record timing). Bisa di-pickle untuk process pool.
+    def __init__(self, func):
+        self.func = func
+
+    def __call__(self, input_path, *args):
+        with recording(input_path) as record:
+            result = self.func(input_path, *args)
+        if result is None and record["error"] is None:
+            record["error"] = "Tidak ada output"
+        return result, record
+
+
+class RunReport:
+    # Agregasi record dari semua worker menjadi laporan JSON/CSV
+    def __init__(self, pipeline):
+        self.pipeline = pipeline
+        self.started = time.time()
+        self.records = []
+        self.skipped = 0
+        self.duplicates = []  # Near-duplicate dari dedupe.DuplicateFilter
+        self.rejected = []    # Gagal cek preflight.Preflight
+
+    def add(self, record):
+        self.records.append(record)
+
+    def histogram(self, values):
+        counts = [0] * (len(HISTOGRAM_BUCKETS) + 1)
+        for value in values:
+            index = next((i for i, bound in enumerate(HISTOGRAM_BUCKETS) if value <= bound), len(HISTOGRAM_BUCKETS))
+            counts[index] += 1
+        labels = [f"<={bound}s" for bound in HISTOGRAM_BUCKETS] + [f">{HISTOGRAM_BUCKETS[-1]}s"]
+        return dict(zip(labels, counts))
+
+    def summary(self):
+        stage_names = [name for name in STAGES if any(name in r["stages"] for r in self.records)]
+        stage_names += sorted({name for r in self.records for name in r["stages"]} - set(stage_names))
+        stages = {}
+        for name in stage_names:
+            values = [r["stages"][name] for r in self.records if name in r["stages"]]
+            stages[name] = {"count": len(values), "total": sum(values),
+                            "mean": sum(values) / len(values), "histogram": self.histogram(values)}
+        slowest = sorted(self.records, key=lambda r: r["total"], reverse=True)[:SLOWEST_COUNT]
+        return {
+            "pipeline": self.pipeline,
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+            "wall_seconds": time.time() - self.started,
+            "processed": len(self.records),
+            "skipped": self.skipped,
+            "failed": sum(1 for r in self.records if r["error"]),
+            "duplicates": self.duplicates,
+            "rejected": self.rejected,
+            "stages": stages,
+            "slowest": [{"file": r["file"], "total": r["total"], "stages": r["stages"]} for r in slowest],
+            "failures": [{"file": r["file"], "error": r["error"]} for r in self.records if r["error"]],
+            "warnings": [{"file": r["file"], "warnings": r["warnings"]} for r in self.records if r.get("warnings")],
+        }
+
+    def write_json(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.summary(), f, indent=2)
+
+    def write_csv(self, path):
+        # Satu baris per file dengan kolom per tahap
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["file", "total", *STAGES, "error"])
+            for r in self.records:
+                writer.writerow([r["file"], f"{r['total']:.4f}",
+                                 *(f"{r['stages'][name]:.4f}" if name in r["stages"] else "" for name in STAGES),
+                                 r["error"] or ""])
+
+
+def deep_dive(func, *args, top=25):
+    # Profil satu file: cProfile (waktu CPU per fungsi) + tracemalloc (alokasi memori terbesar)
+    import pstats
+    import cProfile
+    import tracemalloc
+    tracemalloc.start()
+    profiler = cProfile.Profile()
+    instrumented = Instrumented(func)
+    try:
+        (result, record) = profiler.runcall(instrumented, *args)
+        snapshot = tracemalloc.take_snapshot()
+        _current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    stream = io.StringIO()
+    pstats.Stats(profiler, stream=stream).sort_stats("cumulative").print_stats(top)
+    print(stream.getvalue())
+    print(f"Peak memori Python (tracemalloc): {peak / (1024 * 1024):.1f} MB")
+    for stat in snapshot.statistics("lineno")[:10]:
+        print(stat)
+    print("Tahap:", json.dumps(record["stages"], indent=2))
+    return result, record
+
+if __name__ == "__main__":
+    # python instrument.py <module> <fungsi> <argumen...>
+    # contoh: python instrument.py final_with_timestamp resize_and_save_with_metadata "sizing/3d (136).png" sizing_out/debug.png
+    module_name, func_name, *func_args = sys.argv[1:]
+    func = getattr(importlib.import_module(module_name), func_name)
+    # Lewat modul "instrument" (bukan __main__) supaya stage() di pipeline memakai record yang sama
+    importlib.import_module("instrument").deep_dive(func, *[int(a) if a.isdigit() else a for a in func_args])
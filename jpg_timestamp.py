@@ -1,129 +1,112 @@
+import io
 import os
-import xml.etree.ElementTree as ET
+import sys
 from PIL import Image
-from tqdm import tqdm
-from concurrent.futures import ThreadPoolExecutor
-from datetime import datetime
-import subprocess
+from xmp_jpeg import save_jpeg_with_xmp, copy_jpeg_with_xmp, get_exiftool_worker
+from batch import process_batch
+from xmp_reader import read_xmp
+from xmp_metadata import extract_xmp_metadata, create_xmp_packet
+from metadata_rules import load_rules, DEFAULT_RULES_FILE
+from resizing import target_size, prepare_draft, downscale
+from instrument import stage, fail
+from fileio import atomic_path
 
 MAX_DIMENSION = 7000
+EXECUTOR_BACKEND = "process"  # "thread" atau "process"
+MAX_WORKERS = None           # None = jumlah core CPU
+INCREMENTAL = True           # Lewati file yang sudah tercatat di manifest folder output
+DEDUPE = None                # "skip"/"flag": near-duplicate (perceptual hash) dilewati/dicatat sebelum encode
+DEDUPE_DISTANCE = 6          # Jarak Hamming dHash 64-bit maksimal yang dianggap duplikat
+PREFLIGHT = False            # Tolak gambar kosong/transparan/aspek ekstrem sebelum resize (preflight.py)
+RECURSIVE = False            # Ikut proses subfolder di input_folder
+MAX_IN_FLIGHT = None         # Maksimal gambar yang diproses bersamaan (None = jumlah worker)
+MEMORY_BUDGET_MB = None      # Batas perkiraan memori semua job yang jalan (None = setengah RAM)
+JPEG_QUALITY = 95
+RULES_FILE = DEFAULT_RULES_FILE  # Banned words, sinonim keyword, batas panjang, dst. (None = tanpa aturan)
+FAST_DOWNSCALE = True        # Draft decode JPEG (DCT scaling) + reducing_gap untuk gambar besar
+PASS_THROUGH = True          # JPEG tanpa resize: ganti segmen XMP saja, tanpa encode ulang
+REPORT_NAME = ".run_report"  # Laporan run (JSON + CSV) di folder output
+XMP_WRITER = "native"        # "native" (segmen APP1 langsung) atau "exiftool" (proses -stay_open)
+ASYNC_IO = False             # Baca/encode/tulis tumpang tindih (asyncio + process pool), hanya XMP_WRITER "native"
+NAMING = "timestamp"         # "timestamp" (YYYYMMDD_HHMMSS_001, satu timestamp per run) atau "hash" (hash konten)
 
 def extract_xmp_from_jpeg(filepath):
-    with open(filepath, 'rb') as f:
-        data = f.read()
-    start = data.find(b'<x:xmpmeta')
-    end = data.find(b'</x:xmpmeta')
-    if start != -1 and end != -1:
-        xmp_bytes = data[start:end+12]  # len('</x:xmpmeta>') = 12
-        return xmp_bytes
-    return None
-
-def extract_xmp_metadata(xmp_content):
-    if not xmp_content:
-        return "", "", []
-    try:
-        xmp_str = xmp_content.decode("utf-8", errors="ignore")
-        root = ET.fromstring(xmp_str)
-    except ET.ParseError:
-        return "", "", []
-
-    ns = {
-        'rdf': 'http://www.w3.org/1999/02/22-rdf-syntax-ns#',
-        'dc': 'http://purl.org/dc/elements/1.1/'
-    }
-
-    desc = root.find(".//rdf:Description", ns)
-    if desc is None:
-        return "", "", []
-
-    title_elem = desc.find(".//dc:title/rdf:Alt/rdf:li", ns)
-    title = title_elem.text if title_elem is not None else ""
-
-    desc_elem = desc.find(".//dc:description/rdf:Alt/rdf:li", ns)
-    description = desc_elem.text if desc_elem is not None else ""
-
-    keywords = [li.text for li in desc.findall(".//dc:subject/rdf:Bag/rdf:li", ns)]
-
-    return title, description, keywords
-
-def create_xmp_packet(title, description, keywords):
-    keyword_tags = "\n".join(f"<rdf:li>{kw}</rdf:li>" for kw in keywords)
-    return f"""<?xpacket begin='' id='W5M0MpCehiHzreSzNTczkc9d'?>
-<x:xmpmeta xmlns:x='adobe:ns:meta/' x:xmptk='Python'>
-<rdf:RDF xmlns:rdf='http://www.w3.org/1999/02/22-rdf-syntax-ns#'>
-  <rdf:Description rdf:about=''
-    xmlns:dc='http://purl.org/dc/elements/1.1/'>
-    <dc:title><rdf:Alt><rdf:li xml:lang='x-default'>{title}</rdf:li></rdf:Alt></dc:title>
-    <dc:description><rdf:Alt><rdf:li xml:lang='x-default'>{description}</rdf:li></rdf:Alt></dc:description>
-    <dc:subject><rdf:Bag>{keyword_tags}</rdf:Bag></dc:subject>
-  </rdf:Description>
-</rdf:RDF>
-</x:xmpmeta>
-<?xpacket end='w'?>"""
-
-
-def resize_and_save_jpeg(input_path, output_folder, file_index):
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = os.path.basename(input_path)
-    name, ext = os.path.splitext(filename)
-    new_filename = f"{timestamp}_{file_index:03d}.jpg"
-    output_path = os.path.join(output_folder, new_filename)
+    # Hanya membaca segmen header sampai SOS, bukan seluruh file
+    return read_xmp(filepath)
 
-    try:
-        # 1. Ambil dan ubah XMP metadata
-        xmp_data = extract_xmp_from_jpeg(input_path)
+
+def convert_jpeg_with_metadata(source, output):
+    # source/output: path atau file object biner (XMP_WRITER "exiftool" butuh path output)
+    # 1. Ambil dan ubah XMP metadata
+    with stage("metadata_parse"):
+        xmp_data = extract_xmp_from_jpeg(source)
         title, description, keywords = extract_xmp_metadata(xmp_data)
 
-        # 👉 Misal: hapus kata "Rahasia" dari title
-        banned_words = ["Rahasia."]
-        for word in banned_words:
-            title = title.replace(word, "")
-            description = description.replace(word, "")
-
-        # Buat XMP baru hasil edit
-        new_xmp = create_xmp_packet(title.strip(), description, keywords)
-        xmp_file = os.path.join(output_folder, f"{new_filename}.xmp")
-        with open(xmp_file, "w", encoding="utf-8") as f:
-            f.write(new_xmp)
-
-        # 2. Resize dan simpan JPEG baru
-        with Image.open(input_path) as img:
-            width, height = img.size
-            if max(width, height) > MAX_DIMENSION:
-                scale = MAX_DIMENSION / max(width, height)
-                new_size = (int(width * scale), int(height * scale))
-                resized_image = img.resize(new_size, Image.LANCZOS)
-            else:
-                resized_image = img.copy()
-            resized_image.save(output_path, "JPEG", quality=95, optimize=True)
-
-        # 3. Inject XMP hasil edit ke file JPEG dengan exiftool
-        subprocess.run([
-            "exiftool",
-            "-overwrite_original",
-            f"-XMP<={xmp_file}",
-            output_path
-        ], check=True)
-
-        # (Opsional) Hapus file sidecar XMP jika tidak dibutuhkan
-        os.remove(xmp_file)
+        # 👉 Misal: hapus kata "Rahasia" dari title (aturan di RULES_FILE, di-compile sekali per worker)
+        title, description, keywords = load_rules(RULES_FILE).apply(title, description, keywords)
+
+    # Buat XMP baru hasil edit
+    with stage("metadata_inject"):
+        new_xmp = create_xmp_packet(title, description, keywords)
+
+    # 2. Resize dan simpan JPEG baru
+    with stage("open"):
+        img = Image.open(source)
+    with img:
+        new_size = target_size(img.size, MAX_DIMENSION)
+        if new_size is None and img.format == "JPEG" and PASS_THROUGH:
+            # Tidak perlu resize: sisipkan XMP ke segmen JPEG sumber tanpa encode ulang
+            copy_jpeg_with_xmp(source, output, new_xmp)
+            return
+
+        with stage("decode"):
+            if new_size and FAST_DOWNSCALE:
+                prepare_draft(img, new_size)
+            img.load()
+
+        # Jika tidak perlu resize, simpan langsung dari gambar sumber tanpa copy()
+        resized_image = img
+        if new_size:
+            with stage("resize"):
+                resized_image = downscale(img, new_size, fast=FAST_DOWNSCALE)
+
+        # 3. Inject XMP hasil edit ke file JPEG
+        if XMP_WRITER == "native":
+            # Segmen APP1 XMP disisipkan saat menyimpan, file ditulis sekali
+            save_jpeg_with_xmp(resized_image, output, new_xmp, quality=JPEG_QUALITY, optimize=True)
+        else:
+            with stage("encode"):
+                resized_image.save(output, "JPEG", quality=JPEG_QUALITY, optimize=True)
+            get_exiftool_worker().inject_xmp(output, new_xmp)
+
+def convert_jpeg_bytes(data):
+    # Versi bytes -> bytes untuk pipeline async (dijalankan di process pool)
+    output = io.BytesIO()
+    convert_jpeg_with_metadata(io.BytesIO(data), output)
+    return output.getvalue()
+
+
+def resize_and_save_jpeg(input_path, output_path):
+    # output_path sudah ditentukan proses utama (naming.OutputNamer)
+    filename = os.path.basename(input_path)
+
+    try:
+        with atomic_path(output_path) as temp_path:
+            convert_jpeg_with_metadata(input_path, temp_path)
+        return output_path
 
     except Exception as e:
-        print(f"Error processing {filename}: {e}")
+        fail(filename, e)
 
 
 def process_jpeg_folder(input_folder, output_folder):
-    if not os.path.exists(output_folder):
-        os.makedirs(output_folder)
-
-    image_files = [os.path.join(input_folder, f) for f in os.listdir(input_folder)
-                   if f.lower().endswith(('.jpg', '.jpeg'))]
-
-    with ThreadPoolExecutor(max_workers=4) as executor:
-        list(tqdm(executor.map(lambda f, idx: resize_and_save_jpeg(f, output_folder, idx),
-                               image_files, range(1, len(image_files) + 1)),
-                  total=len(image_files),
-                  desc="Processing JPEG Images"))
+    if ASYNC_IO and XMP_WRITER != "native":
+        raise ValueError("ASYNC_IO butuh XMP_WRITER = \"native\" (exiftool menulis langsung ke file)")
+    params = {"pipeline": "jpeg_xmp_timestamp", "max_dimension": MAX_DIMENSION, "format": "JPEG",
+              "quality": JPEG_QUALITY, "rules": load_rules(RULES_FILE).fingerprint, "fast_downscale": FAST_DOWNSCALE,
+              "pass_through": PASS_THROUGH, "naming": NAMING}
+    process_batch(sys.modules[__name__], input_folder, output_folder, ('.jpg', '.jpeg'), params,
+                  resize_and_save_jpeg, desc="Processing JPEG Images", async_func=convert_jpeg_bytes, ext=".jpg")
 
 if __name__ == "__main__":
     input_folder = "sizing"
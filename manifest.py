@@ -0,0 +1,148 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+import hashlib
+
+MANIFEST_NAME = ".manifest.sqlite"
+HASH_CHUNK_SIZE = 1024 * 1024
+COMMIT_EVERY = 20  # Commit berkala supaya run yang terputus tetap bisa dilanjutkan
+
+def file_hash(path):
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def params_hash(params):
+    # Parameter proses (MAX_DIMENSION, kualitas, transform metadata, ...) ikut menentukan output
+    encoded = json.dumps(params, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.blake2b(encoded, digest_size=10).hexdigest()
+
+
+class Manifest:
+    # Manifest di folder output: hash konten sumber + parameter -> file output
+    def __init__(self, output_folder, params, filename=MANIFEST_NAME):
+        self.output_folder = output_folder
+        self.params_key = params_hash(params)
+        self._pending = {}
+        self._uncommitted = 0
+        self.skipped = 0
+        self.resumed = False
+        # Koneksi dipakai dua thread pada pipeline async (iter_pending di thread producer, finish di thread
+        # pemanggil), jadi setiap akses SQLite lewat self.lock
+        self.lock = threading.RLock()
+        self.connection = sqlite3.connect(os.path.join(output_folder, filename), check_same_thread=False)
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS outputs (
+                source_hash TEXT NOT NULL,
+                params_hash TEXT NOT NULL,
+                output_name TEXT NOT NULL,
+                source_path TEXT,
+                created REAL,
+                PRIMARY KEY (source_hash, params_hash)
+            );
+            CREATE TABLE IF NOT EXISTS sources (
+                path TEXT PRIMARY KEY,
+                size INTEGER,
+                mtime_ns INTEGER,
+                source_hash TEXT
+            );
+            CREATE TABLE IF NOT EXISTS runs (
+                params_hash TEXT PRIMARY KEY,
+                run_timestamp TEXT NOT NULL,
+                started REAL,
+                finished REAL
+            );
+        """)
+
+    def source_hash(self, path):
+        # Hash lama dipakai lagi selama ukuran dan mtime file tidak berubah
+        stat = os.stat(path)
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT source_hash FROM sources WHERE path = ? AND size = ? AND mtime_ns = ?",
+                (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)).fetchone()
+        if row:
+            return row[0]
+        digest = file_hash(path)
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO sources (path, size, mtime_ns, source_hash) VALUES (?, ?, ?, ?)",
+                (os.path.abspath(path), stat.st_size, stat.st_mtime_ns, digest))
+        return digest
+
+    def lookup(self, source_hash):
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT output_name FROM outputs WHERE source_hash = ? AND params_hash = ?",
+                (source_hash, self.params_key)).fetchone()
+        if row and os.path.exists(os.path.join(self.output_folder, row[0])):
+            return row[0]
+        return None
+
+    def iter_pending(self, paths, skip_done=True):
+        # Generator: hanya file baru/berubah (atau yang outputnya hilang) yang perlu diproses
+        for path in paths:
+            digest = self.source_hash(path)
+            if skip_done and self.lookup(digest) is not None:
+                self.skipped += 1
+                continue
+            self._pending[path] = digest
+            yield path
+
+    def pending_hash(self, path):
+        return self._pending[path]
+
+    def finish(self, path, output_path):
+        # Dipanggil untuk setiap file yang diberikan iter_pending; hanya yang berhasil dicatat
+        digest = self._pending.pop(path)
+        if output_path:
+            with self.lock:
+                self.record(digest, path, output_path)
+                self._uncommitted += 1
+                if self._uncommitted >= COMMIT_EVERY:
+                    self.connection.commit()
+                    self._uncommitted = 0
+
+    def begin_run(self, new_timestamp):
+        # Run sebelumnya dengan parameter sama yang belum selesai dilanjutkan dengan timestamp yang sama;
+        # selain itu new_timestamp(timestamp_run_sebelumnya) dipakai untuk run baru
+        row = self.connection.execute("SELECT run_timestamp, finished FROM runs WHERE params_hash = ?",
+                                      (self.params_key,)).fetchone()
+        if row and row[1] is None:
+            self.resumed = True
+            return row[0]
+        timestamp = new_timestamp(row[0] if row else None)
+        self.connection.execute(
+            "INSERT OR REPLACE INTO runs (params_hash, run_timestamp, started, finished) VALUES (?, ?, ?, NULL)",
+            (self.params_key, timestamp, time.time()))
+        self.connection.commit()
+        return timestamp
+
+    def end_run(self):
+        with self.lock:
+            self.connection.execute("UPDATE runs SET finished = ? WHERE params_hash = ?",
+                                    (time.time(), self.params_key))
+
+    def record(self, source_hash, source_path, output_path):
+        # Nama relatif terhadap folder output (output boleh di subfolder, mis. rendition)
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO outputs (source_hash, params_hash, output_name, source_path, created) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (source_hash, self.params_key, os.path.relpath(output_path, self.output_folder), source_path,
+                 time.time()))
+
+    def close(self):
+        with self.lock:
+            self.connection.commit()
+            self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
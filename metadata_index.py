@@ -0,0 +1,170 @@
+import os
+import sys
+import time
+import zlib
+import struct
+import sqlite3
+import argparse
+from parallel import imap_bounded
+from walker import iter_images
+from manifest import file_hash
+from xmp_reader import read_header
+from xmp_metadata import extract_xmp_metadata
+
+INDEX_DB = "metadata_index.sqlite"
+EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp", ".avif")
+EXECUTOR_BACKEND = "process"  # "thread" atau "process"
+MAX_WORKERS = None            # None = jumlah core CPU
+COMMIT_EVERY = 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS images (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    size INTEGER,
+    mtime_ns INTEGER,
+    hash TEXT,
+    format TEXT,
+    width INTEGER,
+    height INTEGER,
+    title TEXT,
+    description TEXT,
+    keywords TEXT
+);
+CREATE INDEX IF NOT EXISTS images_hash ON images (hash);
+CREATE VIRTUAL TABLE IF NOT EXISTS images_fts USING fts5(
+    title, description, keywords, content='images', content_rowid='id'
+);
+"""
+
+def connect(db_path=INDEX_DB):
+    connection = sqlite3.connect(db_path)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.executescript(SCHEMA)
+    return connection
+
+def read_entry(path):
+    # Dijalankan di worker: header + XMP saja (tanpa decode pixel) dan hash konten
+    try:
+        stat = os.stat(path)
+        header = read_header(path)
+        title, description, keywords = extract_xmp_metadata(header["xmp"])
+        width, height = header["size"] or (None, None)
+        return {"path": path, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "hash": file_hash(path),
+                "format": header["format"], "width": width, "height": height, "title": title,
+                "description": description, "keywords": ", ".join(kw for kw in keywords if kw)}
+    except (OSError, ValueError, IndexError, struct.error, zlib.error) as e:
+        # Header rusak/terpotong: file ini dilewati, index tetap dibangun
+        print(f"Error indexing {path}: {e!r}")
+        return None
+
+def _delete(connection, row):
+    # Tabel FTS external-content: baris lama harus dihapus dengan nilai lamanya
+    row_id, title, description, keywords = row
+    connection.execute("INSERT INTO images_fts (images_fts, rowid, title, description, keywords) "
+                       "VALUES ('delete', ?, ?, ?, ?)", (row_id, title, description, keywords))
+    connection.execute("DELETE FROM images WHERE id = ?", (row_id,))
+
+def _upsert(connection, entry):
+    row = connection.execute("SELECT id, title, description, keywords FROM images WHERE path = ?",
+                             (entry["path"],)).fetchone()
+    if row:
+        _delete(connection, row)
+    cursor = connection.execute(
+        "INSERT INTO images (path, size, mtime_ns, hash, format, width, height, title, description, keywords) "
+        "VALUES (:path, :size, :mtime_ns, :hash, :format, :width, :height, :title, :description, :keywords)", entry)
+    connection.execute("INSERT INTO images_fts (rowid, title, description, keywords) VALUES (?, ?, ?, ?)",
+                       (cursor.lastrowid, entry["title"], entry["description"], entry["keywords"]))
+
+def build_index(folder, db_path=INDEX_DB, recursive=True):
+    # Incremental: hanya file baru atau yang mtime/ukurannya berubah yang dibaca ulang.
+    # Path disimpan absolut, jadi 'sizing' dan './sizing' (atau cwd lain) tidak membuat baris ganda
+    connection = connect(db_path)
+    folder = os.path.abspath(folder)
+    prefix = os.path.join(folder, "")
+    known = {}
+    for path, size, mtime_ns in connection.execute("SELECT path, size, mtime_ns FROM images").fetchall():
+        if os.path.isabs(path):
+            known[path] = (size, mtime_ns)
+        elif os.path.abspath(path).startswith(prefix):
+            # Index lama menyimpan path relatif: dihapus, file di-index ulang dengan path absolut
+            _delete(connection, connection.execute("SELECT id, title, description, keywords FROM images "
+                                                   "WHERE path = ?", (path,)).fetchone())
+    seen = set()
+
+    def changed_files():
+        for path in iter_images(folder, EXTENSIONS, recursive=recursive):
+            path = os.path.abspath(path)
+            seen.add(path)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if known.get(path) != (stat.st_size, stat.st_mtime_ns):
+                yield path
+
+    updated = 0
+    for _, entry in imap_bounded(read_entry, changed_files(), backend=EXECUTOR_BACKEND,
+                                 max_workers=MAX_WORKERS, desc="Indexing"):
+        if entry:
+            _upsert(connection, entry)
+            updated += 1
+            if updated % COMMIT_EVERY == 0:
+                connection.commit()
+
+    # File yang sudah tidak ada di folder dihapus dari index.
+    # Non-rekursif: hanya file langsung di folder ini, baris subfolder (dari run rekursif) dibiarkan
+    removed = [path for path in known if path.startswith(prefix) and path not in seen
+               and (recursive or os.path.dirname(path) == os.path.dirname(prefix))]
+    for path in removed:
+        row = connection.execute("SELECT id, title, description, keywords FROM images WHERE path = ?",
+                                 (path,)).fetchone()
+        _delete(connection, row)
+    connection.commit()
+    connection.close()
+    return updated, len(removed)
+
+def search(query, db_path=INDEX_DB, limit=50):
+    # Query FTS5, mis. 'sunset AND beach', 'title:kucing', 'keywords:"3d render"'
+    # ValueError jika sintaks query FTS5 tidak valid (mis. 'a&b'; kata biasa bisa dikutip: '"a&b"')
+    connection = sqlite3.connect(db_path)
+    try:
+        return connection.execute(
+            "SELECT images.path, images.title, images.keywords, images.width, images.height "
+            "FROM images_fts JOIN images ON images.id = images_fts.rowid "
+            "WHERE images_fts MATCH ? ORDER BY bm25(images_fts) LIMIT ?", (query, limit)).fetchall()
+    except sqlite3.OperationalError as e:
+        if str(e).startswith("no such table"):
+            raise
+        raise ValueError(f"Query tidak valid: {query} ({e})") from None
+    finally:
+        connection.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Index metadata XMP library gambar + pencarian keyword")
+    parser.add_argument("--db", default=INDEX_DB, help="File SQLite index")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    index_parser = subparsers.add_parser("index", help="Bangun/perbarui index dari folder")
+    index_parser.add_argument("folder")
+    index_parser.add_argument("--no-recursive", action="store_true")
+    search_parser = subparsers.add_parser("search", help="Cari berdasarkan title/description/keywords")
+    search_parser.add_argument("query")
+    search_parser.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args()
+
+    if args.command == "index":
+        start = time.perf_counter()
+        updated, removed = build_index(args.folder, args.db, recursive=not args.no_recursive)
+        print(f"{updated} file diperbarui, {removed} dihapus ({time.perf_counter() - start:.1f} detik)")
+    else:
+        start = time.perf_counter()
+        try:
+            rows = search(args.query, args.db, args.limit)
+        except ValueError as e:
+            parser.error(str(e))
+        for path, title, keywords, width, height in rows:
+            print(f"{path}\t{width}x{height}\t{title}\t{keywords}")
+        print(f"{len(rows)} hasil ({(time.perf_counter() - start) * 1000:.1f} ms)", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
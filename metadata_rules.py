@@ -0,0 +1,111 @@
+import os
+import re
+import json
+import hashlib
+from functools import lru_cache
+
+# Aturan transform metadata (banned words/regex, sinonim keyword, dedupe, batas jumlah/panjang)
+# dari file JSON, di-compile sekali per proses.
+# Default: metadata_rules.json di samping modul ini, bukan relatif ke working directory.
+DEFAULT_RULES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "metadata_rules.json")
+DEFAULT_RULES = {
+    "banned_words": [],         # Kata utuh dihapus dari title/description; keyword yang memuatnya dibuang
+    "banned_patterns": [],      # Regex, diperlakukan sama seperti banned_words
+    "ignore_case": False,
+    "keyword_synonyms": {},     # {"kitty": "cat"} -> keyword diganti bentuk bakunya
+    "dedupe_keywords": False,   # True: keyword kembar (beda huruf besar/kecil) dibuang
+    "max_keywords": None,
+    "max_title_length": None,
+    "max_description_length": None,
+}
+
+def trie_pattern(words):
+    # Gabungkan ribuan kata jadi satu regex berbentuk trie: di setiap posisi regex hanya
+    # menelusuri satu cabang per karakter, jadi biayanya tidak naik linear dengan jumlah kata.
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def to_regex(node):
+        optional = "" in node
+        branches = [re.escape(char) + to_regex(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        pattern = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{pattern})?" if optional else pattern
+
+    return to_regex(trie)
+
+def _truncate(text, max_length):
+    # Potong di batas kata terakhir sebelum max_length
+    if not max_length or len(text) <= max_length:
+        return text
+    cut = text[:max_length + 1].rsplit(" ", 1)[0] if " " in text[:max_length + 1] else text[:max_length]
+    return cut[:max_length].rstrip(" ,.;:-")
+
+def _join_gap(match):
+    # Kata yang dihapus di tengah baris -> satu spasi; di awal/akhir baris atau menempel kata -> kosong
+    text, start, end = match.string, match.start(), match.end()
+    at_edge = start == 0 or end == len(text) or text[start - 1] == "\n" or text[end] == "\n"
+    spaced = match.group()[:1] in " \t" or match.group()[-1:] in " \t"
+    return " " if spaced and not at_edge else ""
+
+
+class MetadataRules:
+    def __init__(self, rules=None):
+        self.rules = {**DEFAULT_RULES, **(rules or {})}
+        self.fingerprint = hashlib.sha1(json.dumps(self.rules, sort_keys=True).encode("utf-8")).hexdigest()
+
+        flags = re.IGNORECASE if self.rules["ignore_case"] else 0
+        words = [word for word in self.rules["banned_words"] if word]
+        # Kata hanya cocok utuh ("cat" tidak mengenai "education"); batas dari lookaround, bukan \b, karena
+        # kata boleh diakhiri tanda baca ("Rahasia."). Regex banned_patterns dipakai apa adanya.
+        parts = ([rf"(?<!\w)(?:{trie_pattern(words)})(?!\w)"] if words else []) + \
+            [f"(?:{p})" for p in self.rules["banned_patterns"]]
+        self.banned = re.compile("|".join(parts), flags) if parts else None
+        # Untuk title/description: ikut spasi/tab di sekitar match, baris baru tidak disentuh
+        self._banned_spaced = re.compile(r"[ \t]*(?:(?:" + "|".join(parts) + r")[ \t]*)+", flags) if parts else None
+        self.synonyms = {key.lower(): value for key, value in self.rules["keyword_synonyms"].items()}
+
+    def clean_text(self, text, max_length=None):
+        if not text:
+            return text or ""
+        if self._banned_spaced is not None:
+            text = self._banned_spaced.sub(_join_gap, text)
+        return _truncate(text.strip(), max_length)
+
+    def clean_keywords(self, keywords):
+        result = []
+        seen = set()
+        for keyword in keywords:
+            if not keyword:
+                continue
+            keyword = keyword.strip()
+            keyword = self.synonyms.get(keyword.lower(), keyword)
+            if self.banned is not None and self.banned.search(keyword):
+                continue
+            if self.rules["dedupe_keywords"]:
+                key = keyword.lower()
+                if key in seen:
+                    continue
+                seen.add(key)
+            result.append(keyword)
+        return result[:self.rules["max_keywords"]] if self.rules["max_keywords"] else result
+
+    def apply(self, title, description, keywords):
+        return (self.clean_text(title, self.rules["max_title_length"]),
+                self.clean_text(description, self.rules["max_description_length"]),
+                self.clean_keywords(keywords))
+
+
+@lru_cache(maxsize=None)
+def load_rules(path):
+    # Di-cache per proses: setiap worker hanya compile aturan sekali.
+    # path None/"" -> tanpa aturan; file yang disebut tapi tidak ada -> FileNotFoundError (bukan diam-diam kosong)
+    if not path:
+        return MetadataRules()
+    with open(path, encoding="utf-8") as f:
+        return MetadataRules(json.load(f))
@@ -0,0 +1,54 @@
+import os
+import time
+from datetime import datetime
+
+# Penamaan output yang ditentukan di proses utama sebelum dispatch, jadi nama tidak tergantung
+# kapan worker kebetulan jalan:
+#   timestamp: <timestamp run>_<urutan>.ext, satu timestamp untuk seluruh batch, urutan = posisi file
+#              di daftar input lengkap (termasuk yang dilewati manifest), jadi batch yang dilanjutkan
+#              menghasilkan nama yang sama seperti jika tidak pernah terputus
+#   hash:      <hash konten sumber>.ext, rerun dan file duplikat menghasilkan nama yang sama
+NAMING_SCHEMES = ("timestamp", "hash")
+TIMESTAMP_FORMAT = "%Y%m%d_%H%M%S"
+HASH_NAME_LENGTH = 16
+
+def new_run_timestamp(previous=None):
+    # Timestamp run baru, selalu lebih besar dari run sebelumnya di folder yang sama
+    # (dua run dalam detik yang sama akan menimpa nama satu sama lain)
+    while True:
+        timestamp = datetime.now().strftime(TIMESTAMP_FORMAT)
+        if previous is None or timestamp > previous:
+            return timestamp
+        time.sleep(0.1)
+
+
+class OutputNamer:
+    def __init__(self, output_folder, scheme="timestamp", run_timestamp=None, source_hash=None, ext=None):
+        if scheme not in NAMING_SCHEMES:
+            raise ValueError(f"Skema penamaan tidak dikenal: {scheme} (pilih {', '.join(NAMING_SCHEMES)})")
+        if scheme == "hash" and source_hash is None:
+            raise ValueError("Skema hash butuh source_hash (mis. Manifest.pending_hash)")
+        self.output_folder = output_folder
+        self.scheme = scheme
+        self.run_timestamp = run_timestamp or new_run_timestamp()
+        self.source_hash = source_hash
+        self.ext = ext
+        self._index = {}
+
+    def number(self, paths, start=1):
+        # Catat posisi setiap file di daftar input lengkap sebelum disaring manifest.
+        # start > 1: lanjutan urutan yang sudah dipakai (mis. file baru di work queue)
+        for index, path in enumerate(paths, start):
+            self._index[path] = index
+            yield path
+
+    def output_path(self, input_path):
+        name, ext = os.path.splitext(os.path.basename(input_path))
+        ext = self.ext or ext
+        index = self._index.pop(input_path, None)
+        if self.scheme == "hash":
+            new_filename = f"{self.source_hash(input_path)[:HASH_NAME_LENGTH]}{ext}"
+        else:
+            # Format nama file baru: YYYYMMDD_HHMMSS_urutan.ext (urutan minimal 3 digit: 001, 002, dst)
+            new_filename = f"{self.run_timestamp}_{index:03d}{ext}"
+        return os.path.join(self.output_folder, new_filename)
@@ -0,0 +1,92 @@
+import os
+import importlib
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+DEFAULT_BACKEND = "process"  # "thread" atau "process"
+BACKENDS = ("thread", "process")
+
+# State per worker: di backend process cukup global per proses, di backend thread pakai thread-local
+_process_state = {}
+_thread_state = threading.local()
+# Konstanta modul pipeline yang diubah lewat configure(), diterapkan ulang di setiap worker baru
+_overrides = {}
+
+def default_workers():
+    return os.cpu_count() or 1
+
+def worker_state():
+    # Dict yang bertahan selama worker hidup, untuk reuse objek mahal antar file
+    if threading.current_thread() is threading.main_thread():
+        return _process_state
+    if not hasattr(_thread_state, "data"):
+        _thread_state.data = {}
+    return _thread_state.data
+
+def configure(module, **values):
+    # Ubah konstanta modul (MAX_DIMENSION, JPEG_QUALITY, ...) di proses ini dan di worker yang dibuat sesudahnya.
+    # Perlu untuk start method "spawn" (Windows), di mana worker meng-import ulang modul dengan nilai default.
+    for name, value in values.items():
+        if not hasattr(module, name):
+            raise AttributeError(f"{module.__name__} tidak punya konstanta {name}")
+        setattr(module, name, value)
+    _overrides.setdefault(module.__name__, {}).update(values)
+
+def _init_worker(initializer, initargs, overrides):
+    for module_name, values in overrides.items():
+        module = importlib.import_module(module_name)
+        for name, value in values.items():
+            setattr(module, name, value)
+    if initializer is not None:
+        initializer(*initargs)
+
+def create_executor(backend=DEFAULT_BACKEND, max_workers=None, initializer=None, initargs=()):
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend tidak dikenal: {backend} (pilih {', '.join(BACKENDS)})")
+    max_workers = max_workers or default_workers()
+    executor_class = ProcessPoolExecutor if backend == "process" else ThreadPoolExecutor
+    return executor_class(max_workers=max_workers, initializer=_init_worker,
+                          initargs=(initializer, initargs, _overrides))
+
+def default_chunksize(total, max_workers):
+    # Sekitar 4 chunk per worker supaya beban tetap rata tapi overhead IPC kecil
+    if not total:
+        return 1
+    return max(1, total // (max_workers * 4))
+
+def run_parallel(func, items, *iterables, backend=DEFAULT_BACKEND, max_workers=None, chunksize=None,
+                 desc=None, initializer=None, initargs=()):
+    # Seperti executor.map(func, items, *iterables); panjang ditentukan oleh items.
+    # Argumen tetap bisa dikirim lewat itertools.repeat(nilai).
+    # Untuk backend process, func dan argumennya harus bisa di-pickle (fungsi top-level, bukan lambda).
+    from tqdm import tqdm  # import berat, hanya saat benar-benar menjalankan batch
+    items = list(items)
+    max_workers = max_workers or default_workers()
+    if chunksize is None:
+        chunksize = default_chunksize(len(items), max_workers)
+
+    with create_executor(backend, max_workers, initializer, initargs) as executor:
+        return list(tqdm(executor.map(func, items, *iterables, chunksize=chunksize),
+                         total=len(items),
+                         desc=desc))
+
+def imap_bounded(func, items, *iterables, backend=DEFAULT_BACKEND, max_workers=None, max_in_flight=None,
+                 desc=None, initializer=None, initargs=()):
+    # Generator (item, hasil) berurutan; items boleh generator dan hanya max_in_flight task
+    # yang disubmit sekaligus, jadi gambar yang sedang di-decode tidak menumpuk di memori.
+    from tqdm import tqdm
+    max_workers = max_workers or default_workers()
+    max_in_flight = max_in_flight or max_workers * 2
+    with create_executor(backend, max_workers, initializer, initargs) as executor, tqdm(desc=desc) as progress:
+        in_flight = deque()
+        for args in zip(items, *iterables):
+            if len(in_flight) >= max_in_flight:
+                item, future = in_flight.popleft()
+                yield item, future.result()
+                progress.update()
+            in_flight.append((args[0], executor.submit(func, *args)))
+        while in_flight:
+            item, future = in_flight.popleft()
+            yield item, future.result()
+            progress.update()
@@ -0,0 +1,54 @@
+import zlib
+import struct
+from fileio import open_file, copy_range
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# Chunk metadata yang bisa dibuang/diganti; chunk lain (IHDR, PLTE, IDAT, iCCP, ...) disalin apa adanya
+METADATA_CHUNKS = (b"tEXt", b"zTXt", b"iTXt", b"eXIf", b"tIME")
+
+def make_chunk(chunk_type, data):
+    crc = zlib.crc32(chunk_type + data) & 0xFFFFFFFF
+    return struct.pack(">I", len(data)) + chunk_type + data + struct.pack(">I", crc)
+
+def text_chunk(key, value):
+    return make_chunk(b"tEXt", key.encode("latin-1") + b"\x00" + value.encode("latin-1"))
+
+def itxt_chunk(key, value, lang="en", tkey="x-default"):
+    # Sama dengan PngInfo.add_itxt(key, value, lang, tkey) tanpa kompresi
+    data = (key.encode("latin-1") + b"\x00\x00\x00" + lang.encode("latin-1") + b"\x00"
+            + tkey.encode("utf-8") + b"\x00" + value.encode("utf-8"))
+    return make_chunk(b"iTXt", data)
+
+def chunk_keyword(data):
+    return data.split(b"\x00", 1)[0].decode("latin-1")
+
+def rewrite_png_metadata(input_path, output_path, new_chunks=(), keep=None):
+    # Salin PNG chunk demi chunk tanpa decode/deflate ulang data gambar, setiap byte ditulis sekali.
+    # Chunk metadata lama dibuang kecuali keep(chunk_type, data) True; new_chunks disisipkan sebelum IDAT.
+    # input_path/output_path boleh path atau file object biner.
+    with open_file(input_path, "rb") as src, open_file(output_path, "wb") as dst:
+        if src.read(8) != PNG_SIGNATURE:
+            raise ValueError("Bukan file PNG")
+        dst.write(PNG_SIGNATURE)
+        inserted = False
+        while True:
+            header = src.read(8)
+            if len(header) < 8:
+                raise ValueError("PNG terpotong (IEND tidak ditemukan)")
+            length, chunk_type = struct.unpack(">I4s", header)
+            if chunk_type == b"IDAT" and not inserted:
+                dst.write(b"".join(new_chunks))
+                inserted = True
+
+            if chunk_type in METADATA_CHUNKS:
+                data = src.read(length)
+                crc = src.read(4)
+                if keep is not None and keep(chunk_type, data):
+                    dst.write(header + data + crc)
+            else:
+                # Data + CRC disalin di kernel jika sumber dan tujuan file sungguhan (IDAT bisa ratusan MB)
+                dst.write(header)
+                copy_range(src, dst, length + 4)
+
+            if chunk_type == b"IEND":
+                break
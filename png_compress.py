@@ -0,0 +1,136 @@
+import io
+import sys
+import time
+import zlib
+import struct
+from collections import deque
+from itertools import repeat
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+from parallel import default_workers
+from png_chunks import PNG_SIGNATURE, make_chunk
+
+# Preset kompresi PNG -> parameter save Pillow. compress_type = strategi zlib (juga dipakai parallel deflate).
+# Filter baris PNG selalu dipilih adaptif per baris oleh encoder Pillow; Pillow tidak membuka pilihan filter.
+PRESETS = {
+    "fast": {"compress_level": 3, "compress_type": zlib.Z_DEFAULT_STRATEGY},
+    "balanced": {"compress_level": 6, "compress_type": zlib.Z_DEFAULT_STRATEGY},
+    "max": {"optimize": True},  # pencarian zlib paling lambat (perilaku lama)
+}
+DEFAULT_PRESET = "fast"
+# Level zlib untuk mode parallel deflate per preset
+PARALLEL_LEVELS = {"fast": 3, "balanced": 6, "max": 9}
+
+PARALLEL_MIN_PIXELS = 16_000_000       # Di bawah ini parallel deflate tidak sebanding overhead-nya
+PARALLEL_CHUNK_SIZE = 4 * 1024 * 1024  # Ukuran potongan data IDAT (band baris) yang dikompres terpisah
+PARALLEL_THREADS = None                # None = jumlah core CPU
+
+def _deflate_part(data, level, strategy, last):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS, 9, strategy)
+    # Z_FULL_FLUSH: blok berakhir di batas byte dan tidak bergantung pada potongan sebelumnya,
+    # jadi hasil tiap potongan bisa langsung disambung menjadi satu stream deflate
+    return compressor.compress(data) + compressor.flush(zlib.Z_FINISH if last else zlib.Z_FULL_FLUSH)
+
+def _zlib_header(level):
+    return b"\x78\xda" if level >= 7 else b"\x78\x9c" if level >= 6 else b"\x78\x5e" if level >= 2 else b"\x78\x01"
+
+def parallel_deflate(data, level, threads=PARALLEL_THREADS, chunk_size=PARALLEL_CHUNK_SIZE,
+                     strategy=zlib.Z_DEFAULT_STRATEGY):
+    # Stream zlib valid dari potongan yang dikompres paralel (zlib melepas GIL, jadi thread cukup)
+    view = memoryview(data)
+    parts = [view[i:i + chunk_size] for i in range(0, len(data), chunk_size)] or [view]
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        compressed = list(executor.map(_deflate_part, parts, repeat(level), repeat(strategy),
+                                       [i == len(parts) - 1 for i in range(len(parts))]))
+    return _zlib_header(level) + b"".join(compressed) + struct.pack(">I", zlib.adler32(data) & 0xFFFFFFFF)
+
+def _iter_chunks(data):
+    pos = len(PNG_SIGNATURE)
+    while pos < len(data):
+        length, chunk_type = struct.unpack(">I4s", data[pos:pos + 8])
+        yield chunk_type, data[pos:pos + 12 + length], data[pos + 8:pos + 8 + length]
+        pos += 12 + length
+
+def _encode_rows(image, top, bottom, pnginfo=None):
+    # Chunk PNG level 0 untuk baris [top, bottom) dengan baris top - 1 di depannya (jika ada), supaya filter
+    # Up/Average/Paeth baris pertama benar; data baris yang sudah difilter tanpa baris tambahan itu
+    start = max(top - 1, 0)
+    buffer = io.BytesIO()
+    image.crop((0, start, image.width, bottom)).save(buffer, format="PNG", pnginfo=pnginfo, compress_level=0)
+    chunks = list(_iter_chunks(buffer.getvalue()))
+    filtered = zlib.decompress(b"".join(data for chunk_type, _, data in chunks if chunk_type == b"IDAT"))
+    if start < top:
+        filtered = filtered[len(filtered) // (bottom - start):]
+    return chunks, filtered
+
+def save_png_parallel(image, fp, pnginfo=None, preset=DEFAULT_PRESET, threads=PARALLEL_THREADS,
+                      chunk_size=PARALLEL_CHUNK_SIZE):
+    # Filter baris dari encoder Pillow (level 0, per band baris), deflate paralel per band, ditulis berurutan
+    # begitu selesai: hanya band yang sedang dikompres di memori, bukan encode level 0 seluruh gambar
+    level = PARALLEL_LEVELS[preset]
+    strategy = PRESETS[preset].get("compress_type", zlib.Z_DEFAULT_STRATEGY)
+    band_rows = max(1, chunk_size // max(1, image.width * len(image.getbands())))
+    threads = threads or default_workers()
+
+    # Chunk sebelum IDAT (IHDR dengan tinggi penuh, PLTE, tRNS, teks, ...) dan sesudahnya dari encode band pertama
+    chunks, first = _encode_rows(image, 0, min(band_rows, image.height), pnginfo)
+    idat_index = next(i for i, (chunk_type, _, _) in enumerate(chunks) if chunk_type == b"IDAT")
+    fp.write(PNG_SIGNATURE)
+    for chunk_type, raw, data in chunks[:idat_index]:
+        if chunk_type == b"IHDR":
+            raw = make_chunk(b"IHDR", data[:4] + struct.pack(">I", image.height) + data[8:])
+        fp.write(raw)
+    trailer = [raw for chunk_type, raw, _ in chunks[idat_index:] if chunk_type not in (b"IDAT", b"IEND")]
+
+    fp.write(make_chunk(b"IDAT", _zlib_header(level)))
+    adler = 1
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        in_flight = deque()
+        top = 0
+        while top < image.height:
+            bottom = min(top + band_rows, image.height)
+            filtered = first if top == 0 else _encode_rows(image, top, bottom)[1]
+            adler = zlib.adler32(filtered, adler)
+            if len(in_flight) >= threads * 2:
+                fp.write(make_chunk(b"IDAT", in_flight.popleft().result()))
+            in_flight.append(executor.submit(_deflate_part, filtered, level, strategy, bottom == image.height))
+            top = bottom
+        del first, filtered
+        while in_flight:
+            fp.write(make_chunk(b"IDAT", in_flight.popleft().result()))
+    fp.write(make_chunk(b"IDAT", struct.pack(">I", adler & 0xFFFFFFFF)))
+    for raw in trailer:
+        fp.write(raw)
+    fp.write(make_chunk(b"IEND", b""))
+
+def save_png(image, fp, pnginfo=None, preset=DEFAULT_PRESET, parallel=False):
+    if preset not in PRESETS:
+        raise ValueError(f"Preset PNG tidak dikenal: {preset} (pilih {', '.join(PRESETS)})")
+    if parallel and image.width * image.height >= PARALLEL_MIN_PIXELS:
+        save_png_parallel(image, fp, pnginfo, preset)
+    else:
+        image.save(fp, format="PNG", pnginfo=pnginfo, **PRESETS[preset])
+
+def compare_presets(image, parallel=False):
+    # Tradeoff ukuran/waktu per preset untuk satu gambar: [(preset, byte, detik), ...]
+    results = []
+    for preset in PRESETS:
+        buffer = io.BytesIO()
+        start = time.perf_counter()
+        if parallel:
+            save_png_parallel(image, buffer, preset=preset)
+        else:
+            save_png(image, buffer, preset=preset)
+        results.append((preset, len(buffer.getvalue()), time.perf_counter() - start))
+    return results
+
+if __name__ == "__main__":
+    # python png_compress.py gambar.png [--parallel]
+    with Image.open(sys.argv[1]) as source:
+        source.load()
+        results = compare_presets(source, parallel="--parallel" in sys.argv)
+    max_size = next(size for preset, size, _ in results if preset == "max")
+    max_time = next(seconds for preset, _, seconds in results if preset == "max")
+    print(f"{'preset':<10} {'ukuran':>12} {'vs max':>8} {'detik':>8} {'speedup':>8}")
+    for preset, size, seconds in results:
+        print(f"{preset:<10} {size:>12,} {size / max_size - 1:>+8.1%} {seconds:>8.2f} {max_time / seconds:>7.1f}x")
@@ -0,0 +1,92 @@
+import io
+import os
+from PIL import Image, PngImagePlugin
+from xmp_reader import read_header, XMP_KEY
+from xmp_metadata import extract_xmp_metadata, create_xmp_packet
+from metadata_rules import load_rules
+from resizing import target_size
+from instrument import stage, fail
+from png_compress import save_png
+from png_chunks import rewrite_png_metadata, itxt_chunk
+from strip_resize import resize_png_strips, supports as strip_supported
+from fileio import open_file, atomic_path
+
+# Resize PNG + XMP (title/description/keywords dibersihkan aturan) bersama untuk final_with_timestamp dan
+# final_resize_and_extract_exif. Setting dikirim eksplisit oleh modul pipeline (dari konstanta modulnya),
+# jadi kedua pipeline tetap punya MAX_DIMENSION, PNG_PRESET, dst. sendiri.
+
+def build_xmp(xmp_data, rules_file):
+    # XMP baru dari XMP sumber (str/bytes atau None) setelah aturan metadata
+    with stage("metadata_parse"):
+        title, description, keywords = extract_xmp_metadata(xmp_data) if xmp_data else ("", "", [])
+        title, description, keywords = load_rules(rules_file).apply(title, description, keywords)
+    with stage("metadata_inject"):
+        return create_xmp_packet(title, description, keywords)
+
+def convert_png_with_metadata(source, output, max_dimension, rules_file=None, pass_through=True,
+                              strip_min_pixels=None, png_preset="fast", parallel=False):
+    # source/output: path atau file object biner; error diteruskan ke pemanggil.
+    # Jalur tanpa decode (pass-through, strip) dipilih dari header (IHDR + chunk teks) sebelum Image.open,
+    # karena Image.open menolak gambar di atas Image.MAX_IMAGE_PIXELS (DecompressionBombError)
+    with stage("open"):
+        header = read_header(source)
+    if header["format"] == "PNG" and header["size"]:
+        width, height = header["size"]
+        new_size = target_size(header["size"], max_dimension)
+        if new_size is None and pass_through:
+            # Tidak perlu resize: ganti chunk metadata saja, IDAT disalin tanpa decode/deflate ulang
+            xmp_string = build_xmp(header["xmp"] or header["text"].get(XMP_KEY), rules_file)
+            with stage("write"):
+                rewrite_png_metadata(source, output,
+                                     [itxt_chunk("XML:com.adobe.xmp", xmp_string, lang="en", tkey="x-default")])
+            return
+        if new_size and strip_min_pixels and width * height >= strip_min_pixels and strip_supported(source):
+            # Gambar sangat besar: decode, resize dan encode per strip, gambar utuh tidak pernah di memori
+            xmp_string = build_xmp(header["xmp"] or header["text"].get(XMP_KEY), rules_file)
+            resize_png_strips(source, output, new_size,
+                              [itxt_chunk("XML:com.adobe.xmp", xmp_string, lang="en", tkey="x-default")],
+                              preset=png_preset)
+            return
+
+    with stage("open"):
+        original_image = Image.open(source)
+    with original_image:
+        # Buat XMP baru
+        xmp_string = build_xmp(original_image.info.get("XML:com.adobe.xmp"), rules_file)
+        new_size = target_size(original_image.size, max_dimension)
+
+        with stage("decode"):
+            original_image.load()
+
+        # Resize jika perlu; jika tidak, simpan langsung dari gambar sumber tanpa copy()
+        image = original_image
+        if new_size:
+            with stage("resize"):
+                image = original_image.resize(new_size, Image.LANCZOS)
+
+        # Simpan ke file baru dengan metadata XMP
+        with stage("metadata_inject"):
+            pnginfo = PngImagePlugin.PngInfo()
+            pnginfo.add_itxt("XML:com.adobe.xmp", xmp_string, lang="en", tkey="x-default")
+
+        # Encoder menulis langsung ke file output (iTXt XMP sebelum IDAT), tanpa buffer seluruh file
+        with stage("encode"), open_file(output, "wb") as f:
+            save_png(image, f, pnginfo, preset=png_preset, parallel=parallel)
+
+def convert_png_bytes(data, **options):
+    # Versi bytes -> bytes untuk pipeline async (dijalankan di process pool)
+    output = io.BytesIO()
+    convert_png_with_metadata(io.BytesIO(data), output, **options)
+    return output.getvalue()
+
+def save_png_with_metadata(input_path, output_path, **options):
+    # output_path sudah ditentukan proses utama; None jika gagal (alasan masuk run report)
+    filename = os.path.basename(input_path)
+
+    try:
+        with atomic_path(output_path) as temp_path:
+            convert_png_with_metadata(input_path, temp_path, **options)
+        return output_path
+
+    except Exception as e:
+        fail(filename, e)
@@ -0,0 +1,128 @@
+import os
+import zlib
+import struct
+from functools import partial
+from PIL import Image
+from resizing import load_reduced, REDUCED_STRIP_MIN_PIXELS
+from scheduler import imap_budgeted, estimate_peak_bytes, default_memory_budget
+
+# Pre-flight sebelum resize/encode: thumbnail kecil (JPEG: draft DCT, PNG besar per strip) dari setiap file dianalisis
+# per batch dengan NumPy (tanpa loop pixel Python). File yang gagal cek tidak dikirim ke worker
+# resize/encode dan dicatat di laporan run bersama metriknya.
+THUMB_SIZE = 128        # Sisi thumbnail analisis (aspek diabaikan; aspek dicek dari ukuran asli)
+BATCH_SIZE = 64         # Thumbnail per analisis vectorized
+LOAD_BACKEND = "thread"  # Decode/resize Pillow melepas GIL; thread tidak perlu pickle/spawn
+
+# Batas penolakan (None = metrik hanya dicatat, tidak menolak)
+MIN_CHANNEL_STD = 2.0       # Gambar kosong/hampir satu warna: std kanal RGB terbesar (0-255) di bawah ini
+MIN_ALPHA_COVERAGE = 0.01   # PNG: porsi pixel yang tidak transparan penuh
+MAX_CLIPPED = None          # Porsi pixel (terlihat) hitam/putih mentok, mis. 0.9
+MAX_NOISE = None            # Perkiraan sigma noise (Immerkaer) di thumbnail, mis. 20.0
+MAX_ASPECT_RATIO = 5.0      # Sisi panjang / sisi pendek
+MIN_DIMENSION = None        # Sisi terpendek minimal (px)
+CLIP_LOW, CLIP_HIGH = 2, 253
+
+LUMA_WEIGHTS = (0.299, 0.587, 0.114)
+
+def load_thumbnail(path):
+    # Dijalankan di worker: (array THUMB_SIZE x THUMB_SIZE x 4 uint8, ada alpha, ukuran asli) atau None
+    import numpy as np
+    try:
+        thumb, size, has_alpha = load_reduced(path, (THUMB_SIZE, THUMB_SIZE), "RGBA")
+        return np.asarray(thumb), has_alpha, size
+    except (OSError, ValueError, struct.error, zlib.error, Image.DecompressionBombError):
+        return None
+
+def analyze(thumbs, sizes):
+    # thumbs: list array (S, S, 4); sizes: list (width, height). Dict metrik per gambar, satu pass NumPy.
+    import numpy as np
+    batch = np.stack(thumbs).astype(np.float32)
+    rgb = batch[..., :3]
+    alpha = batch[..., 3]
+    visible = (alpha > 0).astype(np.float32)
+    coverage = visible.mean(axis=(1, 2))
+    count = np.maximum(visible.sum(axis=(1, 2)), 1.0)
+
+    # Std per kanal hanya dari pixel yang terlihat
+    weights = visible[..., None]
+    mean = (rgb * weights).sum(axis=(1, 2)) / count[:, None]
+    variance = (((rgb - mean[:, None, None, :]) ** 2) * weights).sum(axis=(1, 2)) / count[:, None]
+    channel_std = np.sqrt(variance).max(axis=1)
+
+    luma = rgb @ np.array(LUMA_WEIGHTS, dtype=np.float32)
+    clipped = (((luma <= CLIP_LOW) | (luma >= CLIP_HIGH)) * visible).sum(axis=(1, 2)) / count
+
+    # Immerkaer (1996): sigma ~ sqrt(pi/2) / 6 * mean(|L * I|), L = laplacian 3x3 [1 -2 1; -2 4 -2; 1 -2 1]
+    laplacian = (luma[:, :-2, :-2] - 2 * luma[:, :-2, 1:-1] + luma[:, :-2, 2:]
+                 - 2 * luma[:, 1:-1, :-2] + 4 * luma[:, 1:-1, 1:-1] - 2 * luma[:, 1:-1, 2:]
+                 + luma[:, 2:, :-2] - 2 * luma[:, 2:, 1:-1] + luma[:, 2:, 2:])
+    noise = np.sqrt(np.pi / 2) / 6 * np.abs(laplacian).mean(axis=(1, 2))
+
+    dimensions = np.array(sizes, dtype=np.float32)
+    short_side = dimensions.min(axis=1)
+    aspect = dimensions.max(axis=1) / np.maximum(short_side, 1.0)
+
+    return [{"channel_std": round(float(channel_std[i]), 2), "alpha_coverage": round(float(coverage[i]), 4),
+             "clipped": round(float(clipped[i]), 4), "noise": round(float(noise[i]), 2),
+             "aspect_ratio": round(float(aspect[i]), 3), "short_side": int(short_side[i])}
+            for i in range(len(thumbs))]
+
+def rejection_reasons(metrics, has_alpha):
+    reasons = []
+    if MIN_CHANNEL_STD is not None and metrics["channel_std"] < MIN_CHANNEL_STD:
+        reasons.append("blank")
+    if has_alpha and MIN_ALPHA_COVERAGE is not None and metrics["alpha_coverage"] < MIN_ALPHA_COVERAGE:
+        reasons.append("transparent")
+    if MAX_CLIPPED is not None and metrics["clipped"] > MAX_CLIPPED:
+        reasons.append("clipped")
+    if MAX_NOISE is not None and metrics["noise"] > MAX_NOISE:
+        reasons.append("noisy")
+    if MAX_ASPECT_RATIO is not None and metrics["aspect_ratio"] > MAX_ASPECT_RATIO:
+        reasons.append("aspect_ratio")
+    if MIN_DIMENSION is not None and metrics["short_side"] < MIN_DIMENSION:
+        reasons.append("too_small")
+    return reasons
+
+
+class Preflight:
+    # Saring generator Manifest.iter_pending: hanya file yang lolos cek yang diteruskan ke pipeline
+    def __init__(self, manifest, enabled=True, max_workers=None, budget=None):
+        self.manifest = manifest
+        self.enabled = enabled
+        self.max_workers = max_workers
+        self.budget = budget or default_memory_budget()
+        self.rejected = []
+
+    def filter(self, paths):
+        if not self.enabled:
+            return paths
+        return self._iter_filtered(paths)
+
+    def _iter_filtered(self, paths):
+        # Decode dibatasi budget memori yang sama dengan pipeline (perkiraan dari header), bukan jumlah file
+        batch = []
+        cost = partial(estimate_peak_bytes, max_dimension=THUMB_SIZE, strip_min_pixels=REDUCED_STRIP_MIN_PIXELS)
+        for path, thumbnail in imap_budgeted(load_thumbnail, paths, cost=cost, budget=self.budget,
+                                             backend=LOAD_BACKEND, max_workers=self.max_workers, ordered=True,
+                                             desc="Pre-flight"):
+            if thumbnail is None:
+                # Tidak bisa di-decode: diteruskan supaya error dilaporkan pipeline seperti biasa
+                yield path
+                continue
+            batch.append((path, thumbnail))
+            if len(batch) >= BATCH_SIZE:
+                yield from self._check(batch)
+                batch = []
+        if batch:
+            yield from self._check(batch)
+
+    def _check(self, batch):
+        results = analyze([thumb for _, (thumb, _, _) in batch], [size for _, (_, _, size) in batch])
+        for (path, (_, has_alpha, _)), metrics in zip(batch, results):
+            reasons = rejection_reasons(metrics, has_alpha)
+            if not reasons:
+                yield path
+                continue
+            self.rejected.append({"file": path, "reasons": reasons, "metrics": metrics})
+            print(f"Rejected {os.path.basename(path)}: {', '.join(reasons)}")
+            self.manifest.finish(path, None)
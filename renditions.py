@@ -0,0 +1,161 @@
+import io
+import os
+import sys
+from PIL import Image, PngImagePlugin, features
+from batch import process_batch
+from scheduler import MB
+from xmp_reader import read_xmp
+from xmp_metadata import extract_xmp_metadata, create_xmp_packet
+from metadata_rules import load_rules, DEFAULT_RULES_FILE
+from resizing import target_size, prepare_draft, downscale
+from instrument import stage, fail
+from png_compress import save_png
+from png_chunks import rewrite_png_metadata, itxt_chunk
+from xmp_jpeg import inject_xmp, copy_jpeg_with_xmp
+from fileio import atomic_path, write_file_atomic
+from resize import encode_to_target
+
+# Semua varian dari satu decode: setiap rendition di subfolder <name>/ di folder output
+# (RECURSIVE: <subfolder input>/<name>/). format: "PNG", "JPEG", "WEBP" atau "AVIF"; quality: kualitas
+# lossy tetap; target_mb (hanya JPEG): cari kualitas sampai di bawah target
+RENDITIONS = [
+    {"name": "7000", "max_dimension": 7000, "format": "PNG"},
+    {"name": "5500", "max_dimension": 5500, "format": "PNG"},
+    {"name": "5000", "max_dimension": 5000, "format": "JPEG", "target_mb": 35},
+    {"name": "preview", "max_dimension": 1600, "format": "JPEG", "quality": 85},
+    {"name": "thumb", "max_dimension": 400, "format": "JPEG", "quality": 80},
+]
+EXTENSIONS = {"PNG": ".png", "JPEG": ".jpg", "WEBP": ".webp", "AVIF": ".avif"}
+FEATURES = {"WEBP": "webp", "AVIF": "avif"}  # Modul Pillow yang dibutuhkan format ini
+EXECUTOR_BACKEND = "process"  # "thread" atau "process"
+MAX_WORKERS = None           # None = jumlah core CPU
+INCREMENTAL = True           # Lewati file yang sudah tercatat di manifest folder output
+DEDUPE = None                # "skip"/"flag": near-duplicate (perceptual hash) dilewati/dicatat sebelum encode
+DEDUPE_DISTANCE = 6          # Jarak Hamming dHash 64-bit maksimal yang dianggap duplikat
+RECURSIVE = False            # Ikut proses subfolder di input_folder
+MAX_IN_FLIGHT = None         # Maksimal gambar yang diproses bersamaan (None = jumlah worker)
+MEMORY_BUDGET_MB = None      # Batas perkiraan memori semua job yang jalan (None = setengah RAM)
+FAST_DOWNSCALE = True        # Draft decode JPEG (DCT scaling) + reducing_gap untuk gambar besar
+PASS_THROUGH = True          # Rendition tanpa resize dengan format sama: salin data gambar, ganti XMP saja
+REPORT_NAME = ".run_report"  # Laporan run (JSON + CSV) di folder output
+PNG_PRESET = "fast"          # Kompresi PNG: "fast", "balanced" atau "max" (optimize=True lama)
+PARALLEL_DEFLATE = False     # Kompres IDAT gambar sangat besar paralel di semua core
+JPEG_QUALITY = 95            # Kualitas JPEG/WEBP/AVIF jika rendition tidak menentukan quality/target_mb
+RULES_FILE = DEFAULT_RULES_FILE  # Banned words, sinonim keyword, batas panjang, dst. (None = tanpa aturan)
+
+def rendition_path(output_folder, rendition, input_path):
+    name, _ = os.path.splitext(os.path.basename(input_path))
+    return os.path.join(output_folder, rendition["name"], name + EXTENSIONS[rendition["format"]])
+
+def check_renditions(renditions):
+    # Ditolak sebelum batch mulai, bukan dilewati diam-diam per file
+    for rendition in renditions:
+        fmt = rendition["format"]
+        if fmt not in EXTENSIONS:
+            raise ValueError(f"Rendition {rendition['name']}: format {fmt} tidak didukung "
+                             f"(pilih {', '.join(EXTENSIONS)})")
+        if fmt in FEATURES and not features.check(FEATURES[fmt]):
+            raise ValueError(f"Rendition {rendition['name']}: Pillow ini tidak bisa menulis {fmt}")
+        if rendition.get("target_mb") and fmt != "JPEG":
+            raise ValueError(f"Rendition {rendition['name']}: target_mb hanya untuk JPEG")
+
+def encode_rendition(image, rendition, xmp):
+    # Bytes file rendition (sudah berisi XMP)
+    if rendition["format"] == "PNG":
+        pnginfo = PngImagePlugin.PngInfo()
+        pnginfo.add_itxt("XML:com.adobe.xmp", xmp, lang="en", tkey="x-default")
+        buffer = io.BytesIO()
+        save_png(image, buffer, pnginfo, preset=PNG_PRESET, parallel=PARALLEL_DEFLATE)
+        return buffer.getvalue()
+
+    if rendition["format"] in ("WEBP", "AVIF"):
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "A" in image.mode or "transparency" in image.info else "RGB")
+        buffer = io.BytesIO()
+        image.save(buffer, rendition["format"], quality=rendition.get("quality", JPEG_QUALITY),
+                   xmp=xmp.encode("utf-8"))
+        return buffer.getvalue()
+
+    if image.mode not in ("RGB", "L", "CMYK"):
+        image = image.convert("RGB")
+    if rendition.get("target_mb"):
+        data, _ = encode_to_target(image, "JPEG", rendition["target_mb"] * MB)
+    else:
+        buffer = io.BytesIO()
+        image.save(buffer, "JPEG", quality=rendition.get("quality", JPEG_QUALITY), optimize=True)
+        data = buffer.getvalue()
+    return inject_xmp(data, xmp)
+
+def save_renditions(input_path, output_folder):
+    filename = os.path.basename(input_path)
+    # Dari besar ke kecil: setiap rendition di-downscale dari rendition sebelumnya, bukan dari sumber
+    renditions = sorted(RENDITIONS, key=lambda r: r["max_dimension"], reverse=True)
+
+    try:
+        # XMP dibaca, dibersihkan dan dibuat sekali untuk semua rendition
+        with stage("metadata_parse"):
+            xmp_data = read_xmp(input_path)
+            title, description, keywords = extract_xmp_metadata(xmp_data) if xmp_data else ("", "", [])
+            title, description, keywords = load_rules(RULES_FILE).apply(title, description, keywords)
+        with stage("metadata_inject"):
+            xmp = create_xmp_packet(title, description, keywords)
+
+        with stage("open"):
+            source = Image.open(input_path)
+        with source:
+            source_format = source.format
+            original_size = source.size
+            with stage("decode"):
+                # Draft JPEG cukup untuk rendition terbesar
+                if FAST_DOWNSCALE:
+                    prepare_draft(source, target_size(source.size, renditions[0]["max_dimension"]))
+                source.load()
+
+            image = source
+            output_path = None
+            for rendition in renditions:
+                output_path = rendition_path(output_folder, rendition, input_path)
+                # RECURSIVE: output_folder adalah subfolder cermin, folder rendition di dalamnya dibuat di sini
+                os.makedirs(os.path.dirname(output_path), exist_ok=True)
+                new_size = target_size(image.size, rendition["max_dimension"])
+                if new_size:
+                    with stage("resize"):
+                        image = downscale(image, new_size, fast=FAST_DOWNSCALE)
+
+                # Pass-through hanya jika sumber di-decode di ukuran asli (tanpa draft) dan tidak ada target_mb
+                if image is source and image.size == original_size and PASS_THROUGH and \
+                        source_format == rendition["format"] and not rendition.get("target_mb"):
+                    # Ukuran dan format sama dengan sumber: data gambar disalin, hanya metadata diganti
+                    with stage("write"), atomic_path(output_path) as temp_path:
+                        if source_format == "PNG":
+                            rewrite_png_metadata(input_path, temp_path,
+                                                 [itxt_chunk("XML:com.adobe.xmp", xmp, lang="en", tkey="x-default")])
+                        else:
+                            copy_jpeg_with_xmp(input_path, temp_path, xmp)
+                    continue
+
+                with stage("encode"):
+                    data = encode_rendition(image, rendition, xmp)
+                with stage("write"):
+                    write_file_atomic(output_path, data)
+
+        # Rendition terkecil ditulis terakhir: jika ada, semua rendition file ini lengkap
+        return output_path
+
+    except Exception as e:
+        fail(filename, e)
+
+def process_folder(input_folder, output_folder):
+    check_renditions(RENDITIONS)
+    params = {"pipeline": "renditions", "renditions": RENDITIONS, "fast_downscale": FAST_DOWNSCALE,
+              "pass_through": PASS_THROUGH, "png_preset": PNG_PRESET, "jpeg_quality": JPEG_QUALITY,
+              "rules": load_rules(RULES_FILE).fingerprint}
+    largest = max(rendition["max_dimension"] for rendition in RENDITIONS)
+    process_batch(sys.modules[__name__], input_folder, output_folder, ('.png', '.jpg', '.jpeg'), params,
+                  save_renditions, desc="Processing Renditions", max_dimension=largest,
+                  output_folders=[os.path.join(output_folder, rendition["name"]) for rendition in RENDITIONS])
+
+if __name__ == "__main__":
+    input_folder = "sizing"
+    output_folder = "sizing_renditions"
+    process_folder(input_folder, output_folder)
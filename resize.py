@@ -1,52 +1,117 @@
 import os
+import sys
+import io
 from PIL import Image
 import piexif
-from concurrent.futures import ThreadPoolExecutor
-from tqdm import tqdm
+from batch import process_batch
+from resizing import target_size, prepare_draft, downscale
+from instrument import stage, fail
+from fileio import write_file_atomic
 
 TARGET_FILESIZE_MB = 35  # Target ukuran file dalam MB
 MAX_DIMENSION = 5000     # Maksimal panjang/lebar pixel
+EXECUTOR_BACKEND = "process"  # "thread" atau "process"
+MAX_WORKERS = None           # None = jumlah core CPU
+INCREMENTAL = True           # Lewati file yang sudah tercatat di manifest folder output
+DEDUPE = None                # "skip"/"flag": near-duplicate (perceptual hash) dilewati/dicatat sebelum encode
+DEDUPE_DISTANCE = 6          # Jarak Hamming dHash 64-bit maksimal yang dianggap duplikat
+RECURSIVE = False            # Ikut proses subfolder di input_folder
+MAX_IN_FLIGHT = None         # Maksimal gambar yang diproses bersamaan (None = jumlah worker)
+MEMORY_BUDGET_MB = None      # Batas perkiraan memori semua job yang jalan (None = setengah RAM)
+FAST_DOWNSCALE = True        # Draft decode JPEG (DCT scaling) + reducing_gap untuk gambar besar
+REPORT_NAME = ".run_report"  # Laporan run (JSON + CSV) di folder output
+MAX_QUALITY = 95
+MIN_QUALITY = 10
+
+# Perkiraan awal byte per pixel untuk JPEG (optimize=True) pada kualitas tertentu
+BYTES_PER_PIXEL = [(95, 1.00), (90, 0.70), (80, 0.45), (70, 0.35), (50, 0.25), (30, 0.17), (10, 0.08)]
+
+def estimate_quality(pixel_count, target_bytes):
+    # Tebakan awal kualitas dari target byte per pixel
+    target_bpp = target_bytes / max(pixel_count, 1)
+    for quality, bpp in BYTES_PER_PIXEL:
+        if bpp <= target_bpp:
+            return quality
+    return MIN_QUALITY
+
+def encode_image(image, image_format, quality, exif_data=None):
+    buffer = io.BytesIO()
+    params = {"format": image_format, "quality": quality, "optimize": True}
+    if exif_data:
+        params["exif"] = exif_data
+    image.save(buffer, **params)
+    return buffer.getvalue()
+
+def encode_to_target(image, image_format, target_bytes, exif_data=None, seed=True):
+    # Selain JPEG, kualitas tidak berpengaruh ke ukuran -> cukup encode sekali
+    if image_format != "JPEG":
+        return encode_image(image, image_format, MAX_QUALITY, exif_data), MAX_QUALITY
+
+    data = encode_image(image, image_format, MAX_QUALITY, exif_data)
+    if len(data) <= target_bytes:
+        return data, MAX_QUALITY
+
+    # Binary search kualitas tertinggi yang masih di bawah target, semua di memori
+    low, high = MIN_QUALITY, MAX_QUALITY - 1
+    best, best_quality = None, None
+    guess = estimate_quality(image.width * image.height, target_bytes) if seed else None
+    while low <= high:
+        if guess is not None and low <= guess <= high:
+            quality, guess = guess, None
+        else:
+            quality = (low + high) // 2
+        data = encode_image(image, image_format, quality, exif_data)
+        if len(data) <= target_bytes:
+            best, best_quality = data, quality
+            low = quality + 1
+        else:
+            high = quality - 1
+
+    if best is None:
+        # Tidak ada yang muat, pakai kualitas minimum (sama seperti loop lama)
+        best = data if quality == MIN_QUALITY else encode_image(image, image_format, MIN_QUALITY, exif_data)
+        best_quality = MIN_QUALITY
+    return best, best_quality
 
 def resize_image_to_target(input_path, output_folder):
     filename = os.path.basename(input_path)
     output_path = os.path.join(output_folder, filename)
 
     try:
-        image = Image.open(input_path)
-        exif_data = image.info.get('exif')
+        with stage("open"):
+            image = Image.open(input_path)
+        with stage("metadata_parse"):
+            exif_data = image.info.get('exif')
+        image_format = Image.registered_extensions().get(os.path.splitext(filename)[1].lower(), image.format)
 
-        # Resize jika terlalu besar
-        width, height = image.size
-        if max(width, height) > MAX_DIMENSION:
-            scale = MAX_DIMENSION / max(width, height)
-            new_size = (int(width * scale), int(height * scale))
-            image = image.resize(new_size, Image.LANCZOS)
+        new_size = target_size(image.size, MAX_DIMENSION)
+        with stage("decode"):
+            if new_size and FAST_DOWNSCALE:
+                prepare_draft(image, new_size)
+            image.load()
 
-        temp_quality = 95
-        image.save(output_path, exif=exif_data, quality=temp_quality, optimize=True)
+        # Resize jika terlalu besar
+        if new_size:
+            with stage("resize"):
+                image = downscale(image, new_size, fast=FAST_DOWNSCALE)
 
-        filesize_mb = os.path.getsize(output_path) / (1024 * 1024)
+        # Cari kualitas di memori, tulis ke disk sekali saja
+        target_bytes = TARGET_FILESIZE_MB * 1024 * 1024
+        with stage("encode"):
+            data, _ = encode_to_target(image, image_format, target_bytes, exif_data)
+        with stage("write"):
+            write_file_atomic(output_path, data)
 
-        # Turunkan kualitas jika ukuran lebih dari target
-        while filesize_mb > TARGET_FILESIZE_MB and temp_quality > 10:
-            temp_quality -= 2
-            image.save(output_path, exif=exif_data, quality=temp_quality, optimize=True)
-            filesize_mb = os.path.getsize(output_path) / (1024 * 1024)
+        return output_path
 
     except Exception as e:
-        print(f"Error processing {filename}: {e}")
+        fail(filename, e)
 
 def process_folder(input_folder, output_folder):
-    if not os.path.exists(output_folder):
-        os.makedirs(output_folder)
-
-    image_files = [os.path.join(input_folder, f) for f in os.listdir(input_folder)
-                   if f.lower().endswith(('.jpg', '.jpeg', '.png'))]
-
-    with ThreadPoolExecutor(max_workers=4) as executor:
-        list(tqdm(executor.map(lambda f: resize_image_to_target(f, output_folder), image_files),
-                  total=len(image_files),
-                  desc="Processing Images"))
+    params = {"pipeline": "resize_to_target", "max_dimension": MAX_DIMENSION,
+              "target_filesize_mb": TARGET_FILESIZE_MB, "fast_downscale": FAST_DOWNSCALE}
+    process_batch(sys.modules[__name__], input_folder, output_folder, ('.jpg', '.jpeg', '.png'), params,
+                  resize_image_to_target, desc="Processing Images")
 
 if __name__ == "__main__":
     input_folder = "sizing"   # Ganti sesuai folder kamu
@@ -1,10 +1,27 @@
 import os
+import sys
 from PIL import Image, PngImagePlugin
-from tqdm import tqdm
-from concurrent.futures import ThreadPoolExecutor
+from batch import process_batch
+from resizing import target_size
+from instrument import stage, fail
+from png_compress import save_png
+from fileio import atomic_path
+from png_chunks import rewrite_png_metadata
 
 TARGET_FILESIZE_MB = 35 # Target ukuran file dalam MB (optional, bisa diabaikan untuk PNG)
 MAX_DIMENSION = 5500     # Maksimal panjang/lebar pixel
+EXECUTOR_BACKEND = "process"  # "thread" atau "process"
+MAX_WORKERS = None           # None = jumlah core CPU
+INCREMENTAL = True           # Lewati file yang sudah tercatat di manifest folder output
+DEDUPE = None                # "skip"/"flag": near-duplicate (perceptual hash) dilewati/dicatat sebelum encode
+DEDUPE_DISTANCE = 6          # Jarak Hamming dHash 64-bit maksimal yang dianggap duplikat
+RECURSIVE = False            # Ikut proses subfolder di input_folder
+MAX_IN_FLIGHT = None         # Maksimal gambar yang diproses bersamaan (None = jumlah worker)
+MEMORY_BUDGET_MB = None      # Batas perkiraan memori semua job yang jalan (None = setengah RAM)
+PASS_THROUGH = True          # PNG tanpa resize: tulis ulang chunk metadata saja
+REPORT_NAME = ".run_report"  # Laporan run (JSON + CSV) di folder output
+PNG_PRESET = "fast"          # Kompresi PNG: "fast", "balanced" atau "max" (optimize=True lama)
+PARALLEL_DEFLATE = False     # Kompres IDAT gambar sangat besar paralel di semua core
 
 def resize_png_with_metadata(input_path, output_folder):
     filename = os.path.basename(input_path)
@@ -12,43 +29,51 @@ def resize_png_with_metadata(input_path, output_folder):
 
     try:
         # Buka gambar PNG asli
-        original_image = Image.open(input_path)
+        with stage("open"):
+            original_image = Image.open(input_path)
 
         # Simpan semua info metadata
-        metadata = original_image.info
+        with stage("metadata_parse"):
+            metadata = original_image.info
 
-        # Resize gambar jika perlu
-        width, height = original_image.size
-        if max(width, height) > MAX_DIMENSION:
-            scale = MAX_DIMENSION / max(width, height)
-            new_size = (int(width * scale), int(height * scale))
-            resized_image = original_image.resize(new_size, Image.LANCZOS)
-        else:
-            resized_image = original_image.copy()
+        new_size = target_size(original_image.size, MAX_DIMENSION)
+        if new_size is None and original_image.format == "PNG" and PASS_THROUGH:
+            # Tidak perlu resize: chunk teks dipertahankan, IDAT disalin tanpa decode/deflate ulang
+            with stage("write"), atomic_path(output_path) as temp_path:
+                rewrite_png_metadata(input_path, temp_path,
+                                     keep=lambda chunk_type, data: chunk_type in (b"tEXt", b"zTXt", b"iTXt"))
+            return output_path
+
+        with stage("decode"):
+            original_image.load()
+
+        # Resize gambar jika perlu; jika tidak, simpan langsung dari gambar sumber tanpa copy()
+        image = original_image
+        if new_size:
+            with stage("resize"):
+                image = original_image.resize(new_size, Image.LANCZOS)
 
         # Siapkan metadata baru
-        pnginfo = PngImagePlugin.PngInfo()
-        for key, value in metadata.items():
-            if isinstance(value, str):
-                pnginfo.add_text(key, value)
+        with stage("metadata_inject"):
+            pnginfo = PngImagePlugin.PngInfo()
+            for key, value in metadata.items():
+                if isinstance(value, str):
+                    pnginfo.add_text(key, value)
 
         # Save gambar hasil resize dengan metadata
-        resized_image.save(output_path, format="PNG", pnginfo=pnginfo, optimize=True)
+        with stage("encode"), atomic_path(output_path) as temp_path, open(temp_path, "wb") as f:
+            save_png(image, f, pnginfo, preset=PNG_PRESET, parallel=PARALLEL_DEFLATE)
+
+        return output_path
 
     except Exception as e:
-        print(f"Error processing {filename}: {e}")
+        fail(filename, e)
 
 def process_folder(input_folder, output_folder):
-    if not os.path.exists(output_folder):
-        os.makedirs(output_folder)
-
-    image_files = [os.path.join(input_folder, f) for f in os.listdir(input_folder)
-                   if f.lower().endswith('.png')]
-
-    with ThreadPoolExecutor(max_workers=4) as executor:
-        list(tqdm(executor.map(lambda f: resize_png_with_metadata(f, output_folder), image_files),
-                  total=len(image_files),
-                  desc="Processing PNG Images"))
+    params = {"pipeline": "png_copy_text", "max_dimension": MAX_DIMENSION, "format": "PNG",
+              "pass_through": PASS_THROUGH, "png_preset": PNG_PRESET}
+    process_batch(sys.modules[__name__], input_folder, output_folder, ('.png',), params,
+                  resize_png_with_metadata, desc="Processing PNG Images")
 
 if __name__ == "__main__":
     input_folder = "sizing"
@@ -0,0 +1,69 @@
+import math
+from PIL import Image, ImageChops, ImageStat
+from xmp_reader import read_header
+from strip_resize import supports as strip_supported, thumbnail_strips
+
+REDUCING_GAP = 3.0  # reduce() integer dulu sampai >= 3x ukuran target, baru LANCZOS
+REDUCED_STRIP_MIN_PIXELS = 16_000_000  # load_reduced: PNG sebesar ini diperkecil per strip, tidak di-decode utuh
+STRIP_REDUCE_FACTOR = 8     # load_reduced: strip di-resize ke 8x ukuran target, sisanya BOX
+
+def target_size(size, max_dimension):
+    # Ukuran hasil resize, atau None jika gambar sudah di bawah MAX_DIMENSION
+    width, height = size
+    if max(width, height) <= max_dimension:
+        return None
+    scale = max_dimension / max(width, height)
+    return (int(width * scale), int(height * scale))
+
+def prepare_draft(image, new_size):
+    # JPEG: decode langsung di 1/2, 1/4 atau 1/8 ukuran (DCT scaling) selama hasilnya
+    # masih >= ukuran target. Harus dipanggil sebelum pixel di-load.
+    if new_size is None or image.format != "JPEG":
+        return image.size
+    image.draft(image.mode, new_size)
+    return image.size
+
+def load_reduced(path, size, mode, draft_size=None):
+    # (gambar kecil ukuran size dalam mode, ukuran asli, ada alpha) untuk analisis (dedupe, preflight)
+    # tanpa decode resolusi penuh: JPEG decode draft DCT (>= draft_size), PNG besar di-resize per strip
+    # (juga yang di atas Image.MAX_IMAGE_PIXELS). Format lain di-decode biasa lalu diperkecil.
+    header = read_header(path)
+    if header["format"] == "PNG" and header["size"] and \
+            header["size"][0] * header["size"][1] >= REDUCED_STRIP_MIN_PIXELS and strip_supported(path):
+        # Strip LANCZOS ke ukuran antara, lalu BOX seperti jalur biasa (hasil dHash tetap sebanding)
+        width, height = header["size"]
+        between = (min(size[0] * STRIP_REDUCE_FACTOR, width), min(size[1] * STRIP_REDUCE_FACTOR, height))
+        thumb, transparency = thumbnail_strips(path, between)
+        has_alpha = thumb.mode in ("RGBA", "LA") or transparency
+        return thumb.convert(mode).resize(size, Image.BOX), header["size"], has_alpha
+    with Image.open(path) as image:
+        original_size = image.size
+        has_alpha = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+        image.draft("L" if mode == "L" else "RGB", draft_size or size)
+        return image.convert(mode).resize(size, Image.BOX, reducing_gap=2.0), original_size, has_alpha
+
+def downscale(image, new_size, fast=True):
+    if fast:
+        prepare_draft(image, new_size)
+        return image.resize(new_size, Image.LANCZOS, reducing_gap=REDUCING_GAP)
+    return image.resize(new_size, Image.LANCZOS)
+
+def psnr(image, reference):
+    # Cek kualitas hasil fast downscale terhadap jalur lama (full decode + LANCZOS)
+    diff = ImageChops.difference(image.convert("RGB"), reference.convert("RGB"))
+    stat = ImageStat.Stat(diff)
+    mse = sum(stat.sum2) / (len(stat.sum2) * image.width * image.height)
+    if mse == 0:
+        return math.inf
+    return 10 * math.log10(255 ** 2 / mse)
+
+def compare_fast_downscale(path, max_dimension):
+    # PSNR (dB) jalur cepat vs jalur lama untuk satu file
+    with Image.open(path) as reference_source:
+        new_size = target_size(reference_source.size, max_dimension)
+        if new_size is None:
+            return math.inf
+        reference = reference_source.resize(new_size, Image.LANCZOS)
+    with Image.open(path) as fast_source:
+        fast = downscale(fast_source, new_size, fast=True)
+    return psnr(fast, reference)
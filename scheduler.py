@@ -0,0 +1,106 @@
+import os
+from collections import deque
+from concurrent.futures import wait, FIRST_COMPLETED
+from parallel import create_executor, default_workers, DEFAULT_BACKEND
+from xmp_reader import read_header
+from resizing import target_size
+from strip_resize import supports as strip_supported, peak_bytes as strip_peak_bytes
+
+MB = 1024 * 1024
+LOOKAHEAD = 64        # Jumlah file antrean yang dilihat untuk mengisi celah memori
+MAX_BYPASS = 64       # Setelah dilewati sekian kali, file besar di depan antrean diprioritaskan
+
+# Byte per pixel di memori Pillow (RGB disimpan 4 byte per pixel)
+MODE_BYTES = {"1": 1, "L": 1, "P": 1, "I;16": 2, "LA": 4, "RGB": 4, "RGBA": 4, "CMYK": 4, "I": 4, "F": 4}
+
+def default_memory_budget():
+    # Setengah RAM fisik jika bisa dideteksi, selain itu tanpa batas (None)
+    try:
+        return os.sysconf("SC_PHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") // 2
+    except (AttributeError, ValueError, OSError):
+        return None
+
+def estimate_peak_bytes(path, max_dimension, strip_min_pixels=None):
+    # Perkiraan puncak memori satu job dari header: gambar sumber + hasil resize/copy + buffer encode.
+    # strip_min_pixels: PNG sebesar ini di-resize per strip (strip_resize), memorinya ~ ukuran strip
+    try:
+        header = read_header(path)
+    except Exception:
+        # Header rusak/terpotong (struct.error, zlib.error, dst.): perkiraan dari ukuran file saja,
+        # error sebenarnya dilaporkan worker per file
+        header = {"size": None}
+    if header["size"] is None:
+        return os.path.getsize(path) * 10
+    bytes_per_pixel = MODE_BYTES.get(header["mode"], 4)
+    width, height = header["size"]
+    source = width * height * bytes_per_pixel
+    new_size = target_size(header["size"], max_dimension)
+    if new_size and strip_min_pixels and header["format"] == "PNG" and width * height >= strip_min_pixels \
+            and strip_supported(path):
+        return strip_peak_bytes(header["size"], new_size)
+    output = new_size[0] * new_size[1] * bytes_per_pixel if new_size else source
+    return source + output + output // 2
+
+def imap_budgeted(func, items, *iterables, cost, budget, backend=DEFAULT_BACKEND, max_workers=None,
+                  max_in_flight=None, lookahead=LOOKAHEAD, desc=None, initializer=None, initargs=(),
+                  ordered=False):
+    # Generator (item, hasil) sesuai urutan selesai (ordered=True: urutan input). Job hanya dijalankan
+    # selama total perkiraan memori (cost(item)) yang sedang jalan masih <= budget; job kecil mengisi
+    # celah di sekitar job besar. Job yang melebihi budget sendirian tetap jalan saat tidak ada job lain.
+    from tqdm import tqdm
+    max_workers = max_workers or default_workers()
+    max_in_flight = max_in_flight or max_workers
+    source = enumerate(zip(items, *iterables))
+    waiting = deque()
+    running = {}
+    finished = {}  # ordered=True: hasil yang selesai lebih dulu dari job sebelumnya
+    next_index = 0
+    used = 0
+    bypassed = 0
+    exhausted = False
+
+    with create_executor(backend, max_workers, initializer, initargs) as executor, tqdm(desc=desc) as progress:
+        while True:
+            while not exhausted and len(waiting) < lookahead:
+                job = next(source, None)
+                if job is None:
+                    exhausted = True
+                else:
+                    waiting.append((job, cost(job[1][0])))
+
+            for job, job_cost in list(waiting):
+                if len(running) >= max_in_flight:
+                    break
+                fits = budget is None or used + job_cost <= budget or not running
+                if not fits:
+                    continue
+                if waiting[0][0] is job:
+                    bypassed = 0
+                else:
+                    # Lompati job besar di depan antrean, tapi jangan sampai dia kelaparan
+                    if bypassed >= MAX_BYPASS:
+                        break
+                    bypassed += 1
+                waiting.remove((job, job_cost))
+                index, args = job
+                running[executor.submit(func, *args)] = (index, args[0], job_cost)
+                used += job_cost
+
+            if not running:
+                if exhausted and not waiting:
+                    break
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, item, job_cost = running.pop(future)
+                used -= job_cost
+                if not ordered:
+                    yield item, future.result()
+                    progress.update()
+                    continue
+                finished[index] = (item, future.result())
+                while next_index in finished:
+                    yield finished.pop(next_index)
+                    next_index += 1
+                    progress.update()
@@ -0,0 +1,244 @@
+import io
+import zlib
+import struct
+from PIL import Image
+from png_chunks import PNG_SIGNATURE, make_chunk
+from png_compress import PRESETS, PARALLEL_LEVELS
+from fileio import open_file
+from instrument import stage
+
+# Resize out-of-core untuk PNG yang terlalu besar untuk di-decode utuh:
+# sumber dibaca per strip baris (IDAT di-inflate bertahap), di-resize horizontal per strip,
+# lalu vertikal per band dengan overlap sebesar support filter LANCZOS, dan baris output langsung
+# di-encode ke IDAT. Memori puncak ~ ukuran strip, bukan ukuran gambar.
+# Hasilnya sama dengan image.resize(new_size, Image.LANCZOS) dengan selisih pembulatan float:
+# L/RGB dan kanal alpha <= 1 level. RGBA/LA: nilai premultiplied juga <= 1 level, tapi un-premultiply
+# (dilakukan sekali per band) memperbesarnya ke ~255/alpha di kanal warna, jadi pixel yang hampir
+# transparan bisa beda lebih banyak (mis. <= 3 di alpha >= 128, ~7 di alpha 40).
+STRIP_ROWS = 256          # Baris sumber per strip
+LANCZOS_SUPPORT = 3.0
+READ_BLOCK_SIZE = 1024 * 1024
+
+# Hanya PNG 8-bit non-interlaced tanpa palette: baris raw PNG == tobytes() Pillow
+PNG_COLOR_TYPES = {0: "L", 2: "RGB", 4: "LA", 6: "RGBA"}
+COLOR_TYPE_OF_MODE = {mode: color_type for color_type, mode in PNG_COLOR_TYPES.items()}
+CHANNELS = {"L": 1, "RGB": 3, "LA": 2, "RGBA": 4}
+# Sama dengan Image.resize: alpha di-premultiply selama resampling (lihat toleransi di atas)
+PREMULTIPLIED = {"RGBA": "RGBa", "LA": "La"}
+# Chunk warna/transparansi yang ikut disalin ke output (Pillow juga menyimpannya dari image.info)
+COPIED_CHUNKS = (b"iCCP", b"sRGB", b"gAMA", b"cHRM", b"tRNS")
+
+
+def read_ihdr(fp):
+    # (width, height, bit_depth, color_type, interlace) dari header PNG
+    header = fp.read(33)
+    if header[:8] != PNG_SIGNATURE or header[12:16] != b"IHDR":
+        raise ValueError("Bukan file PNG")
+    width, height, bit_depth, color_type, _, _, interlace = struct.unpack(">IIBBBBB", header[16:29])
+    return width, height, bit_depth, color_type, interlace
+
+def supports(source):
+    # True jika sumber bisa di-resize per strip
+    with open_file(source, "rb") as fp:
+        try:
+            _, _, bit_depth, color_type, interlace = read_ihdr(fp)
+        except (ValueError, struct.error):
+            return False
+    return bit_depth == 8 and color_type in PNG_COLOR_TYPES and not interlace
+
+def peak_bytes(size, new_size, strip_rows=STRIP_ROWS):
+    # Perkiraan memori puncak resize per strip (dipakai scheduler)
+    width, height = size
+    new_width, new_height = new_size
+    window = int(2 * LANCZOS_SUPPORT * height / new_height) + 2
+    return 4 * (3 * width * strip_rows + new_width * (strip_rows + window) * 2)
+
+
+class PngStripReader:
+    # Baca PNG per strip. Unfilter baris dikerjakan decoder Pillow: setiap strip dibungkus jadi PNG kecil
+    # dengan baris terakhir strip sebelumnya (sudah di-unfilter, filter None) di depannya, sehingga
+    # filter Up/Average/Paeth di baris pertama strip tetap benar.
+    def __init__(self, fp):
+        self.fp = fp
+        self.width, self.height, bit_depth, self.color_type, interlace = read_ihdr(fp)
+        if bit_depth != 8 or self.color_type not in PNG_COLOR_TYPES or interlace:
+            raise ValueError("Resize per strip hanya untuk PNG 8-bit non-interlaced tanpa palette")
+        self.mode = PNG_COLOR_TYPES[self.color_type]
+        self.row_bytes = self.width * CHANNELS[self.mode] + 1
+        self.chunks = []
+        self._idat_remaining = self._seek_idat()
+        self._inflater = zlib.decompressobj()
+        self._pending = bytearray()
+        self._previous = bytes(self.row_bytes)
+        self.y = 0
+
+    def _seek_idat(self):
+        while True:
+            length, chunk_type = struct.unpack(">I4s", self.fp.read(8))
+            if chunk_type == b"IDAT":
+                return length
+            data = self.fp.read(length + 4)
+            if chunk_type in COPIED_CHUNKS:
+                self.chunks.append(make_chunk(chunk_type, data[:-4]))
+            if chunk_type == b"IEND":
+                raise ValueError("PNG tanpa IDAT")
+
+    def _inflate_more(self):
+        if self._inflater.unconsumed_tail:
+            data = self._inflater.unconsumed_tail
+        else:
+            while not self._idat_remaining:
+                self.fp.read(4)  # CRC chunk sebelumnya
+                length, chunk_type = struct.unpack(">I4s", self.fp.read(8))
+                if chunk_type != b"IDAT":
+                    raise ValueError("PNG terpotong (data IDAT kurang)")
+                self._idat_remaining = length
+            data = self.fp.read(min(self._idat_remaining, READ_BLOCK_SIZE))
+            if not data:
+                raise ValueError("PNG terpotong")
+            self._idat_remaining -= len(data)
+        # max_length membatasi hasil inflate per langkah (data PNG bisa sangat kompresibel)
+        self._pending += self._inflater.decompress(data, READ_BLOCK_SIZE * 4)
+
+    def read_strip(self, rows=STRIP_ROWS):
+        rows = min(rows, self.height - self.y)
+        need = rows * self.row_bytes
+        while len(self._pending) < need:
+            self._inflate_more()
+        filtered = bytes(self._pending[:need])
+        del self._pending[:need]
+
+        ihdr = struct.pack(">IIBBBBB", self.width, rows + 1, 8, self.color_type, 0, 0, 0)
+        mini = b"".join((PNG_SIGNATURE, make_chunk(b"IHDR", ihdr),
+                         make_chunk(b"IDAT", zlib.compress(self._previous + filtered, 0)),
+                         make_chunk(b"IEND", b"")))
+        with Image.open(io.BytesIO(mini)) as image:
+            image.load()
+            self._previous = b"\x00" + image.crop((0, rows, self.width, rows + 1)).tobytes()
+            strip = image.crop((0, 1, self.width, rows + 1))
+        self.y += rows
+        return strip
+
+
+class PngStripWriter:
+    # Tulis PNG per band baris. Filter adaptif tetap dari encoder Pillow: band di-encode bersama
+    # baris terakhir band sebelumnya (level 0), baris tambahan itu dibuang, sisanya di-deflate ke satu IDAT.
+    def __init__(self, fp, size, mode, chunks=(), level=6, strategy=zlib.Z_FILTERED):
+        self.fp = fp
+        self.width, self.height = size
+        self.mode = mode
+        self.row_bytes = self.width * CHANNELS[mode] + 1
+        # memLevel 9 seperti encoder PNG Pillow
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS, 9, strategy)
+        self._previous = None
+        self.rows_written = 0
+        ihdr = struct.pack(">IIBBBBB", self.width, self.height, 8, COLOR_TYPE_OF_MODE[mode], 0, 0, 0)
+        fp.write(PNG_SIGNATURE + make_chunk(b"IHDR", ihdr) + b"".join(chunks))
+
+    def write(self, band):
+        rows = band
+        if self._previous is not None:
+            rows = Image.new(self.mode, (self.width, band.height + 1))
+            rows.paste(self._previous, (0, 0))
+            rows.paste(band, (0, 1))
+        buffer = io.BytesIO()
+        rows.save(buffer, "PNG", compress_level=0)
+        filtered = zlib.decompress(b"".join(_idat_chunks(buffer.getbuffer())))
+        if self._previous is not None:
+            filtered = filtered[self.row_bytes:]
+        self._write_idat(self._compressor.compress(filtered))
+        self._previous = band.crop((0, band.height - 1, self.width, band.height))
+        self.rows_written += band.height
+
+    def close(self):
+        if self.rows_written != self.height:
+            raise ValueError(f"Baris output {self.rows_written} != tinggi {self.height}")
+        self._write_idat(self._compressor.flush())
+        self.fp.write(make_chunk(b"IEND", b""))
+
+    def _write_idat(self, data):
+        if data:
+            self.fp.write(make_chunk(b"IDAT", data))
+
+def _idat_chunks(data):
+    pos = len(PNG_SIGNATURE)
+    while pos < len(data):
+        length, chunk_type = struct.unpack(">I4s", data[pos:pos + 8])
+        if chunk_type == b"IDAT":
+            yield bytes(data[pos + 8:pos + 8 + length])
+        pos += 12 + length
+
+
+def _source_window(out_index, scale, support, in_size):
+    # Rentang baris sumber [min, max) untuk satu baris output, sama dengan precompute_coeffs Pillow
+    center = (out_index + 0.5) * scale
+    return max(int(center - support + 0.5), 0), min(int(center + support + 0.5), in_size)
+
+def iter_resized_bands(reader, new_size, strip_rows=STRIP_ROWS):
+    # Generator band output (Image mode reader.mode) dari atas ke bawah
+    new_width, new_height = new_size
+    work_mode = PREMULTIPLIED.get(reader.mode, reader.mode)
+    scale = reader.height / new_height
+    support = LANCZOS_SUPPORT * max(scale, 1.0)
+
+    band = None          # Baris sumber [band_start, band_start + band.height) yang sudah di-resize horizontal
+    band_start = 0
+    next_row = 0         # Baris output berikutnya
+    while next_row < new_height:
+        with stage("decode"):
+            strip = reader.read_strip(strip_rows)
+        with stage("resize"):
+            if work_mode != reader.mode:
+                strip = strip.convert(work_mode)
+            strip = strip.resize((new_width, strip.height), Image.LANCZOS) if new_width != reader.width else strip
+            if band is None:
+                band = strip
+            else:
+                joined = Image.new(work_mode, (new_width, band.height + strip.height))
+                joined.paste(band, (0, 0))
+                joined.paste(strip, (0, band.height))
+                band = joined
+            band_end = band_start + band.height
+
+            # Baris output yang seluruh window sumbernya sudah tersedia
+            end_row = next_row
+            while end_row < new_height and _source_window(end_row, scale, support, reader.height)[1] <= band_end:
+                end_row += 1
+            if end_row == next_row:
+                continue
+            box = (0, next_row * scale - band_start, new_width, end_row * scale - band_start)
+            output = band.resize((new_width, end_row - next_row), Image.LANCZOS, box=box)
+            if work_mode != reader.mode:
+                output = output.convert(reader.mode)
+
+            # Buang baris sumber yang tidak dibutuhkan lagi oleh baris output berikutnya
+            next_row = end_row
+            if next_row < new_height:
+                keep_from = _source_window(next_row, scale, support, reader.height)[0]
+                band = band.crop((0, keep_from - band_start, new_width, band.height))
+                band_start = keep_from
+        yield output
+
+def thumbnail_strips(source, size, strip_rows=STRIP_ROWS):
+    # (gambar kecil mode sumber, ada chunk tRNS) dari decode per strip, untuk analisis (resizing.load_reduced)
+    with open_file(source, "rb") as src:
+        reader = PngStripReader(src)
+        thumb = Image.new(reader.mode, size)
+        y = 0
+        for band in iter_resized_bands(reader, size, strip_rows):
+            thumb.paste(band, (0, y))
+            y += band.height
+    return thumb, any(chunk[4:8] == b"tRNS" for chunk in reader.chunks)
+
+def resize_png_strips(source, output, new_size, chunks=(), preset="fast", strip_rows=STRIP_ROWS):
+    # source/output: path atau file object biner; chunks (mis. iTXt XMP) ditulis sebelum IDAT
+    level = PARALLEL_LEVELS[preset]
+    strategy = PRESETS[preset].get("compress_type", zlib.Z_FILTERED)
+    with open_file(source, "rb") as src, open_file(output, "wb") as dst:
+        reader = PngStripReader(src)
+        writer = PngStripWriter(dst, new_size, reader.mode, reader.chunks + list(chunks), level, strategy)
+        for band in iter_resized_bands(reader, new_size, strip_rows):
+            with stage("encode"):
+                writer.write(band)
+        with stage("encode"):
+            writer.close()
@@ -0,0 +1,19 @@
+import os
+
+def iter_images(folder, extensions, recursive=False):
+    # Generator path file gambar via os.scandir, urut per folder supaya penomoran file stabil
+    extensions = tuple(ext.lower() for ext in extensions)
+    folders = [folder]
+    while folders:
+        current = folders.pop()
+        with os.scandir(current) as entries:
+            entries = sorted(entries, key=lambda entry: entry.name)
+        subfolders = []
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                if recursive:
+                    subfolders.append(entry.path)
+            elif entry.name.lower().endswith(extensions):
+                yield entry.path
+        # Dibalik supaya subfolder diproses sesuai urutan nama (stack LIFO)
+        folders.extend(reversed(subfolders))
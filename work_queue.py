@@ -0,0 +1,279 @@
+import os
+import json
+import time
+import socket
+import sqlite3
+import threading
+import importlib
+from parallel import configure, create_executor, default_workers
+from walker import iter_images
+from naming import OutputNamer, new_run_timestamp
+from instrument import Instrumented, RunReport
+
+# Mode batch terdistribusi: coordinator mengisi work queue SQLite dari folder input, worker (proses di
+# mesin ini atau host lain) me-lease job, memprosesnya dengan fungsi per file pipeline yang sudah ada,
+# lalu ack. Lease yang tidak diperpanjang (worker crash) kedaluwarsa dan job diambil worker lain.
+# Nama output ditentukan coordinator saat enqueue, jadi job yang diulang menulis file yang sama.
+QUEUE_DB = "work_queue.sqlite"
+LEASE_SECONDS = 300      # Lama lease; diperpanjang heartbeat selama job masih jalan
+HEARTBEAT_SECONDS = 60   # Interval perpanjangan lease
+MAX_ATTEMPTS = 3         # Lease/gagal sebanyak ini -> job "failed" (cli: queue retry untuk mengulang)
+LEASE_BATCH = 1          # Job yang di-lease sekaligus per worker
+POLL_SECONDS = 2.0       # Jeda cek ulang saat semua job sedang di-lease worker lain
+ENQUEUE_BATCH = 1000     # Insert per transaksi saat enqueue
+BUSY_TIMEOUT_MS = 60000
+# WAL butuh shared memory: hanya untuk worker di host yang sama. Worker di host lain lewat network share
+# (dengan file locking yang benar) -> "DELETE".
+JOURNAL_MODE = "WAL"
+
+# pipeline -> (modul, fungsi per file (input_path, output_path), ekstensi input, ekstensi output)
+QUEUE_PIPELINES = {
+    "png": ("final_with_timestamp", "resize_and_save_with_metadata", (".png",), None),
+    "jpeg": ("jpg_timestamp", "resize_and_save_jpeg", (".jpg", ".jpeg"), ".jpg"),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    input_path TEXT UNIQUE NOT NULL,
+    output_path TEXT NOT NULL,
+    sequence INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_expires REAL,
+    error TEXT,
+    updated REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, lease_expires);
+CREATE TABLE IF NOT EXISTS config (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+STATUSES = ("pending", "leased", "done", "failed")
+
+
+class WorkQueue:
+    # Satu koneksi per proses/thread. Semua perubahan status dalam transaksi BEGIN IMMEDIATE,
+    # jadi dua worker tidak pernah me-lease job yang sama.
+    def __init__(self, db_path=QUEUE_DB):
+        self.db_path = db_path
+        self.connection = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+        self.connection.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+        self.connection.execute(f"PRAGMA journal_mode={JOURNAL_MODE}")
+        self.connection.executescript(SCHEMA)
+
+    def _transaction(self, statements):
+        # statements: fungsi(cursor) yang dijalankan di dalam satu transaksi tulis
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            result = statements(self.connection)
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+        self.connection.execute("COMMIT")
+        return result
+
+    def config(self):
+        return {key: json.loads(value) for key, value in self.connection.execute("SELECT key, value FROM config")}
+
+    def set_config(self, **values):
+        self._transaction(lambda c: c.executemany("INSERT OR REPLACE INTO config (key, value) VALUES (?, ?)",
+                                                  [(key, json.dumps(value)) for key, value in values.items()]))
+
+    def contains(self, input_path):
+        return self.connection.execute("SELECT 1 FROM jobs WHERE input_path = ?", (input_path,)).fetchone() is not None
+
+    def next_sequence(self):
+        return self.connection.execute("SELECT COALESCE(MAX(sequence), 0) + 1 FROM jobs").fetchone()[0]
+
+    def enqueue(self, jobs):
+        # jobs: iterable (input_path, output_path, sequence); input yang sudah ada di queue diabaikan
+        added = 0
+        batch = []
+
+        def insert(c):
+            return c.executemany("INSERT OR IGNORE INTO jobs (input_path, output_path, sequence, updated) "
+                                 "VALUES (?, ?, ?, ?)", [(*job, time.time()) for job in batch]).rowcount
+
+        for job in jobs:
+            batch.append(job)
+            if len(batch) >= ENQUEUE_BATCH:
+                added += self._transaction(insert)
+                batch = []
+        if batch:
+            added += self._transaction(insert)
+        return added
+
+    def lease(self, owner, count=LEASE_BATCH, lease_seconds=LEASE_SECONDS):
+        # [(id, input_path, output_path)] job pending atau yang lease-nya kedaluwarsa
+        def statements(c):
+            now = time.time()
+            # Worker yang crash di job yang sama berulang kali: berhenti mencoba
+            c.execute("UPDATE jobs SET status = 'failed', lease_owner = NULL, updated = ?, "
+                      "error = 'Lease kedaluwarsa ' || attempts || 'x (worker crash?)' "
+                      "WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?", (now, now, MAX_ATTEMPTS))
+            rows = c.execute("SELECT id, input_path, output_path FROM jobs "
+                             "WHERE status = 'pending' OR (status = 'leased' AND lease_expires < ?) "
+                             "ORDER BY id LIMIT ?", (now, count)).fetchall()
+            c.executemany("UPDATE jobs SET status = 'leased', lease_owner = ?, lease_expires = ?, "
+                          "attempts = attempts + 1, updated = ? WHERE id = ?",
+                          [(owner, now + lease_seconds, now, row[0]) for row in rows])
+            return rows
+        return self._transaction(statements)
+
+    def renew(self, owner, job_ids, lease_seconds=LEASE_SECONDS):
+        now = time.time()
+        self._transaction(lambda c: c.executemany(
+            "UPDATE jobs SET lease_expires = ? WHERE id = ? AND lease_owner = ? AND status = 'leased'",
+            [(now + lease_seconds, job_id, owner) for job_id in job_ids]))
+
+    def ack(self, owner, job_id):
+        # False jika lease sudah diambil worker lain (job tetap diselesaikan oleh pemegang lease baru)
+        return self._transaction(lambda c: c.execute(
+            "UPDATE jobs SET status = 'done', lease_owner = NULL, error = NULL, updated = ? "
+            "WHERE id = ? AND lease_owner = ? AND status = 'leased'", (time.time(), job_id, owner)).rowcount) == 1
+
+    def fail(self, owner, job_id, error):
+        # Kembali ke pending untuk dicoba lagi, atau failed jika percobaan sudah habis
+        return self._transaction(lambda c: c.execute(
+            "UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+            "lease_owner = NULL, error = ?, updated = ? WHERE id = ? AND lease_owner = ? AND status = 'leased'",
+            (MAX_ATTEMPTS, error, time.time(), job_id, owner)).rowcount) == 1
+
+    def retry_failed(self):
+        return self._transaction(lambda c: c.execute(
+            "UPDATE jobs SET status = 'pending', attempts = 0, updated = ? WHERE status = 'failed'",
+            (time.time(),)).rowcount)
+
+    def counts(self):
+        counts = dict.fromkeys(STATUSES, 0)
+        counts.update(self.connection.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status"))
+        return counts
+
+    def failures(self, limit=50):
+        return self.connection.execute("SELECT input_path, attempts, error FROM jobs WHERE status = 'failed' "
+                                       "ORDER BY id LIMIT ?", (limit,)).fetchall()
+
+    def has_unfinished(self):
+        return self.connection.execute(
+            "SELECT 1 FROM jobs WHERE status IN ('pending', 'leased') LIMIT 1").fetchone() is not None
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Heartbeat:
+    # Thread yang memperpanjang lease job yang sedang diproses (koneksi SQLite sendiri)
+    def __init__(self, db_path, owner, interval=HEARTBEAT_SECONDS):
+        self.db_path = db_path
+        self.owner = owner
+        self.interval = interval
+        self.held = set()
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        with WorkQueue(self.db_path) as queue:
+            while not self.stopped.wait(self.interval):
+                with self.lock:
+                    job_ids = list(self.held)
+                if job_ids:
+                    queue.renew(self.owner, job_ids)
+
+    def hold(self, job_ids):
+        with self.lock:
+            self.held.update(job_ids)
+
+    def release(self, job_id):
+        with self.lock:
+            self.held.discard(job_id)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stopped.set()
+        self.thread.join()
+
+
+def enqueue_folder(input_folder, output_folder, pipeline="png", constants=None, db_path=QUEUE_DB,
+                   recursive=False):
+    # Coordinator: daftarkan file yang belum ada di queue dengan nama output final
+    # (<timestamp queue>_<urutan>.ext; urutan melanjutkan job yang sudah ada)
+    if pipeline not in QUEUE_PIPELINES:
+        raise ValueError(f"Pipeline tidak dikenal: {pipeline} (pilih {', '.join(QUEUE_PIPELINES)})")
+    _, _, extensions, ext = QUEUE_PIPELINES[pipeline]
+    # Path disimpan absolut: worker berjalan dengan working directory lain (atau di host lain dengan mount sama)
+    input_folder = os.path.abspath(input_folder)
+    output_folder = os.path.abspath(output_folder)
+    with WorkQueue(db_path) as queue:
+        config = queue.config()
+        if config and (config["pipeline"], os.path.abspath(config["output_folder"])) != (pipeline, output_folder):
+            raise ValueError(f"Queue {db_path} sudah dipakai untuk pipeline {config['pipeline']} "
+                             f"-> {config['output_folder']}")
+        run_timestamp = config.get("run_timestamp") or new_run_timestamp()
+        queue.set_config(pipeline=pipeline, output_folder=output_folder, run_timestamp=run_timestamp,
+                         constants={**config.get("constants", {}), **(constants or {})})
+
+        namer = OutputNamer(output_folder, "timestamp", run_timestamp=run_timestamp, ext=ext)
+        start = queue.next_sequence()
+        new_files = (path for path in iter_images(input_folder, extensions, recursive=recursive)
+                     if not queue.contains(path))
+        jobs = ((path, namer.output_path(path), sequence)
+                for sequence, path in enumerate(namer.number(new_files, start), start))
+        return queue.enqueue(jobs)
+
+def run_worker(db_path=QUEUE_DB, worker_id=None, max_jobs=None):
+    # Worker: lease -> proses -> ack sampai tidak ada job pending/leased lagi. Aman dijalankan
+    # berapa pun banyaknya, di proses/host mana pun yang bisa membuka db_path dan folder input/output.
+    owner = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    with WorkQueue(db_path) as queue:
+        config = queue.config()
+        if not config:
+            raise ValueError(f"Queue {db_path} kosong (jalankan enqueue dulu)")
+        module_name, func_name, _, _ = QUEUE_PIPELINES[config["pipeline"]]
+        module = importlib.import_module(module_name)
+        configure(module, **config["constants"])
+        func = Instrumented(getattr(module, func_name))
+        os.makedirs(config["output_folder"], exist_ok=True)
+
+        report = RunReport(f"queue_{config['pipeline']}")
+        processed = 0
+        with Heartbeat(db_path, owner) as heartbeat:
+            while max_jobs is None or processed < max_jobs:
+                jobs = queue.lease(owner)
+                if not jobs:
+                    if not queue.has_unfinished():
+                        break
+                    # Sisa job sedang dipegang worker lain; tunggu selesai atau lease-nya kedaluwarsa
+                    time.sleep(POLL_SECONDS)
+                    continue
+                heartbeat.hold(job_id for job_id, _, _ in jobs)
+                for job_id, input_path, output_path in jobs:
+                    result, record = func(input_path, output_path)
+                    heartbeat.release(job_id)
+                    if result:
+                        queue.ack(owner, job_id)
+                    else:
+                        queue.fail(owner, job_id, record["error"])
+                    report.add(record)
+                    processed += 1
+    return report
+
+def run_local_workers(db_path=QUEUE_DB, workers=None, max_jobs=None):
+    # Beberapa worker sebagai proses di mesin ini; hasil: list RunReport per worker
+    workers = workers or default_workers()
+    with create_executor("process", workers) as executor:
+        futures = [executor.submit(run_worker, db_path, f"{socket.gethostname()}:local{i}", max_jobs)
+                   for i in range(workers)]
+        return [future.result() for future in futures]
@@ -0,0 +1,218 @@
+import os
+import struct
+import subprocess
+from multiprocessing.util import Finalize
+from parallel import worker_state
+from fileio import open_file, copy_range
+from instrument import stage
+
+XMP_HEADER = b"http://ns.adobe.com/xap/1.0/\x00"
+MAX_SEGMENT_PAYLOAD = 65533  # 0xFFFF dikurangi 2 byte panjang segmen
+
+SOI = b"\xff\xd8"
+APP0 = 0xE0
+APP1 = 0xE1
+SOS = 0xDA
+
+def build_xmp_segment(xmp):
+    if isinstance(xmp, str):
+        xmp = xmp.encode("utf-8")
+    payload = XMP_HEADER + xmp
+    if len(payload) > MAX_SEGMENT_PAYLOAD:
+        raise ValueError(f"XMP terlalu besar untuk satu segmen APP1 ({len(payload)} byte)")
+    return b"\xff\xe1" + struct.pack(">H", len(payload) + 2) + payload
+
+def iter_segments(data):
+    # Hasil: (marker, start, end) untuk setiap segmen sebelum SOS, lalu (SOS, start, len(data))
+    if data[:2] != SOI:
+        raise ValueError("Bukan file JPEG")
+    pos = 2
+    while pos < len(data):
+        if data[pos] != 0xFF:
+            raise ValueError(f"Marker JPEG tidak valid di offset {pos}")
+        marker = data[pos + 1]
+        if marker == 0xFF:  # padding
+            pos += 1
+            continue
+        if marker == SOS:
+            yield marker, pos, len(data)
+            return
+        length = struct.unpack(">H", data[pos + 2:pos + 4])[0]
+        yield marker, pos, pos + 2 + length
+        pos += 2 + length
+
+def is_xmp_segment(data, marker, start):
+    return marker == APP1 and data[start + 4:start + 4 + len(XMP_HEADER)] == XMP_HEADER
+
+def inject_xmp(jpeg_bytes, xmp):
+    # Sisipkan/ganti segmen XMP APP1 tanpa encode ulang data gambar
+    segment = build_xmp_segment(xmp)
+    parts = [SOI]
+    inserted = False
+    for marker, start, end in iter_segments(jpeg_bytes):
+        if is_xmp_segment(jpeg_bytes, marker, start):
+            continue
+        # XMP ditaruh setelah APP0 (JFIF) dan APP1 Exif, sebelum segmen lainnya
+        if not inserted and marker not in (APP0, APP1):
+            parts.append(segment)
+            inserted = True
+        parts.append(jpeg_bytes[start:end])
+    return b"".join(parts)
+
+class XmpInsertingWriter:
+    # File-like untuk image.save(..., "JPEG"): output encoder diteruskan langsung ke fp, segmen XMP
+    # disisipkan di posisinya saat header lewat. Hanya header (sampai segmen pertama selain APP0/APP1)
+    # yang ditahan di memori, data gambar tidak pernah dikumpulkan dalam satu buffer.
+    def __init__(self, fp, xmp):
+        self.fp = fp
+        self.segment = build_xmp_segment(xmp)
+        self.head = bytearray()
+        self.done = False
+
+    def write(self, data):
+        if self.done:
+            return self.fp.write(data)
+        self.head += data
+        self._flush_head()
+        return len(data)
+
+    def _flush_head(self):
+        parts = [SOI]
+        for marker, start, end in _iter_complete_segments(self.head):
+            if marker not in (APP0, APP1):
+                parts.append(self.segment)
+                self.fp.write(b"".join(parts))
+                self.fp.write(self.head[start:])
+                self.head = None
+                self.done = True
+                return
+            if not is_xmp_segment(self.head, marker, start):
+                parts.append(self.head[start:end])
+
+    def flush(self):
+        if self.done:
+            self.fp.flush()
+
+    def close(self):
+        # Tidak menutup fp; hanya memastikan header sudah lewat (XMP benar-benar tertulis)
+        if not self.done:
+            raise ValueError("Header JPEG tidak lengkap, XMP tidak tertulis")
+
+def _iter_complete_segments(data):
+    # Seperti iter_segments, tapi berhenti tanpa error jika data header belum lengkap
+    if len(data) < 2:
+        return
+    if data[:2] != SOI:
+        raise ValueError("Bukan file JPEG")
+    pos = 2
+    while pos + 4 <= len(data):
+        if data[pos] != 0xFF:
+            raise ValueError(f"Marker JPEG tidak valid di offset {pos}")
+        marker = data[pos + 1]
+        if marker == 0xFF:
+            pos += 1
+            continue
+        end = pos + 2 + struct.unpack(">H", data[pos + 2:pos + 4])[0]
+        if marker not in (APP0, APP1):
+            yield marker, pos, end
+            return
+        if end > len(data):
+            return
+        yield marker, pos, end
+        pos = end
+
+def save_jpeg_with_xmp(image, output_path, xmp, **save_kwargs):
+    # Encoder menulis langsung ke file dengan XMP disisipkan di header: file ditulis sekali,
+    # tanpa buffer encode + salinan hasil inject (output_path boleh file object)
+    with stage("encode"), open_file(output_path, "wb") as f:
+        writer = XmpInsertingWriter(f, xmp)
+        image.save(writer, "JPEG", **save_kwargs)
+        writer.close()
+
+def copy_jpeg_with_xmp(input_path, output_path, xmp):
+    # Salin JPEG sumber dengan segmen XMP baru: hanya segmen header yang dibaca ke memori,
+    # data gambar (SOS sampai EOF) disalin di kernel jika keduanya file sungguhan
+    segment = build_xmp_segment(xmp)
+    with stage("write"), open_file(input_path, "rb") as src, open_file(output_path, "wb") as dst:
+        if src.read(2) != SOI:
+            raise ValueError("Bukan file JPEG")
+        dst.write(SOI)
+        inserted = False
+        while True:
+            prefix = src.read(2)
+            if len(prefix) < 2 or prefix[0] != 0xFF:
+                raise ValueError("Marker JPEG tidak valid")
+            marker = prefix[1]
+            if marker == 0xFF:  # padding
+                src.seek(-1, 1)
+                continue
+            # XMP ditaruh setelah APP0 (JFIF) dan APP1 Exif, sebelum segmen lainnya
+            if not inserted and marker not in (APP0, APP1):
+                dst.write(segment)
+                inserted = True
+            if marker == SOS:
+                dst.write(prefix)
+                copy_range(src, dst)
+                return
+            length_bytes = src.read(2)
+            data = src.read(struct.unpack(">H", length_bytes)[0] - 2)
+            if marker == APP1 and data.startswith(XMP_HEADER):
+                continue
+            dst.write(prefix + length_bytes + data)
+
+def inject_xmp_file(path, xmp):
+    with open(path, "rb") as f:
+        data = f.read()
+    with open(path, "wb") as f:
+        f.write(inject_xmp(data, xmp))
+
+
+class ExiftoolWorker:
+    # Satu proses exiftool -stay_open yang dipakai ulang untuk banyak file
+    def __init__(self, executable="exiftool"):
+        self.process = subprocess.Popen(
+            [executable, "-stay_open", "True", "-@", "-"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+        )
+
+    def execute(self, *args):
+        command = "\n".join(args) + "\n-execute\n"
+        self.process.stdin.write(command.encode("utf-8"))
+        self.process.stdin.flush()
+        output = b""
+        while not output.rstrip().endswith(b"{ready}"):
+            line = self.process.stdout.readline()
+            if not line:
+                raise RuntimeError("exiftool berhenti tanpa respon")
+            output += line
+        return output.decode("utf-8", errors="ignore").rstrip()[:-len("{ready}")].strip()
+
+    def inject_xmp(self, path, xmp):
+        # exiftool membaca XMP dari file sidecar sementara
+        xmp_file = f"{path}.xmp"
+        with open(xmp_file, "w", encoding="utf-8") as f:
+            f.write(xmp)
+        try:
+            with stage("metadata_inject"):
+                output = self.execute("-overwrite_original", f"-XMP<={xmp_file}", path)
+        finally:
+            os.remove(xmp_file)
+        if "1 image files updated" not in output:
+            raise RuntimeError(f"exiftool gagal: {output}")
+
+    def close(self):
+        if self.process.poll() is None:
+            self.process.stdin.write(b"-stay_open\nFalse\n")
+            self.process.stdin.flush()
+            self.process.wait()
+
+
+def get_exiftool_worker(executable="exiftool"):
+    # Satu ExiftoolWorker per worker thread/proses, ditutup saat proses selesai
+    state = worker_state()
+    worker = state.get("exiftool")
+    if worker is None:
+        worker = state["exiftool"] = ExiftoolWorker(executable)
+        # Finalize juga jalan saat worker ProcessPoolExecutor berhenti (atexit tidak)
+        Finalize(worker, worker.close, exitpriority=10)
+    return worker
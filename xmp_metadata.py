@@ -0,0 +1,135 @@
+import hashlib
+import threading
+from collections import OrderedDict
+import xml.etree.ElementTree as ET
+
+# Satu-satunya tempat parse/generate XMP dc:title, dc:description dan dc:subject
+RDF = "{http://www.w3.org/1999/02/22-rdf-syntax-ns#}"
+DC = "{http://purl.org/dc/elements/1.1/}"
+TITLE = DC + "title"
+DESCRIPTION = DC + "description"
+SUBJECT = DC + "subject"
+LI = RDF + "li"
+
+FEED_SIZE = 2048            # Packet diumpankan bertahap supaya parse bisa berhenti lebih awal
+STREAM_THRESHOLD = 16384    # Packet lebih besar dari ini di-parse streaming (mis. DocumentAncestors panjang)
+CACHE_SIZE = 4096           # Packet yang sama sering berulang di satu seri stock
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()  # Backend thread: get/move_to_end/popitem tidak boleh saling menyela
+
+def _parse_tree(xmp_bytes):
+    # Packet kecil: build tree di C lalu iter() langsung ke elemen dc, tanpa XPath ".//"
+    root = ET.fromstring(xmp_bytes)
+    title = description = ""
+    keywords = ()
+    for elem in root.iter(TITLE):
+        li = next(elem.iter(LI), None)
+        title = (li.text or "") if li is not None else ""
+        break
+    for elem in root.iter(DESCRIPTION):
+        li = next(elem.iter(LI), None)
+        description = (li.text or "") if li is not None else ""
+        break
+    for elem in root.iter(SUBJECT):
+        keywords = tuple(li.text for li in elem.iter(LI))
+        break
+    return title, description, keywords
+
+def _parse_stream(xmp_bytes):
+    # Packet besar: pull parser yang berhenti begitu title, description dan subject lengkap
+    parser = ET.XMLPullParser(events=("start", "end"))
+    stack = []
+    title = description = None
+    keywords = []
+    subject_done = False
+    for offset in range(0, len(xmp_bytes), FEED_SIZE):
+        parser.feed(xmp_bytes[offset:offset + FEED_SIZE])
+        for event, elem in parser.read_events():
+            if event == "start":
+                stack.append(elem.tag)
+                continue
+            stack.pop()
+            if elem.tag != LI:
+                if elem.tag == SUBJECT:
+                    subject_done = True
+                continue
+            # rdf:li di dalam dc:xxx/rdf:Alt atau dc:subject/rdf:Bag
+            parent = stack[-2] if len(stack) >= 2 else None
+            if parent == TITLE and title is None:
+                title = elem.text or ""
+            elif parent == DESCRIPTION and description is None:
+                description = elem.text or ""
+            elif parent == SUBJECT and stack[-1] == RDF + "Bag":
+                keywords.append(elem.text)
+        if title is not None and description is not None and subject_done:
+            break  # Semua field sudah ketemu, sisa packet tidak perlu di-parse
+    return title or "", description or "", tuple(keywords)
+
+def _parse(xmp_bytes):
+    if len(xmp_bytes) > STREAM_THRESHOLD:
+        return _parse_stream(xmp_bytes)
+    return _parse_tree(xmp_bytes)
+
+def extract_xmp_metadata(xmp_content):
+    # (title, description, keywords) dari packet XMP (bytes/str); packet rusak -> ("", "", [])
+    if not xmp_content:
+        return "", "", []
+    if isinstance(xmp_content, str):
+        xmp_content = xmp_content.encode("utf-8")
+
+    key = hashlib.sha1(xmp_content).digest()
+    with _cache_lock:
+        result = _cache.get(key)
+        if result is not None:
+            _cache.move_to_end(key)
+    if result is None:
+        try:
+            result = _parse(xmp_content)
+        except ET.ParseError:
+            # Byte non-UTF-8 (mis. Latin-1 "caf\xe9"): dibuang seperti decode(errors="ignore") lama
+            try:
+                result = _parse(xmp_content.decode("utf-8", errors="ignore").encode("utf-8"))
+            except ET.ParseError:
+                result = ("", "", ())
+        with _cache_lock:
+            _cache[key] = result
+            if len(_cache) > CACHE_SIZE:
+                _cache.popitem(last=False)
+
+    title, description, keywords = result
+    return title, description, list(keywords)
+
+# Template packet dipecah sekali di awal; create_xmp_packet hanya menyambung potongan
+_PACKET_HEAD = """<?xpacket begin='' id='W5M0MpCehiHzreSzNTczkc9d'?>
+<x:xmpmeta xmlns:x='adobe:ns:meta/' x:xmptk='Python'>
+<rdf:RDF xmlns:rdf='http://www.w3.org/1999/02/22-rdf-syntax-ns#'>
+  <rdf:Description rdf:about=''
+    xmlns:dc='http://purl.org/dc/elements/1.1/'>
+    <dc:title><rdf:Alt><rdf:li xml:lang='x-default'>"""
+_PACKET_DESCRIPTION = """</rdf:li></rdf:Alt></dc:title>
+    <dc:description><rdf:Alt><rdf:li xml:lang='x-default'>"""
+_PACKET_SUBJECT = """</rdf:li></rdf:Alt></dc:description>
+    <dc:subject><rdf:Bag>"""
+_PACKET_TAIL = """</rdf:Bag></dc:subject>
+  </rdf:Description>
+</rdf:RDF>
+</x:xmpmeta>
+<?xpacket end='w'?>"""
+
+_SEPARATOR = "\x00"
+_LI_SEPARATOR = "</rdf:li>\n<rdf:li>"
+
+def escape(text):
+    # Sama dengan xml.sax.saxutils.escape, tanpa ikut meng-import urllib (startup CLI lebih cepat)
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+def create_xmp_packet(title, description, keywords):
+    # Nilai di-escape (&, <, >) supaya packet tetap XML valid
+    # Semua keyword di-escape sekaligus, dipisah \x00 (karakter yang memang tidak valid di XML)
+    keywords = [kw or "" for kw in keywords]
+    keyword_tags = ""
+    if keywords:
+        keyword_tags = "<rdf:li>" + escape(_SEPARATOR.join(keywords)).replace(_SEPARATOR, _LI_SEPARATOR) + "</rdf:li>"
+    return "".join((_PACKET_HEAD, escape(title or ""), _PACKET_DESCRIPTION, escape(description or ""),
+                    _PACKET_SUBJECT, keyword_tags, _PACKET_TAIL))
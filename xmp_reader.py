@@ -0,0 +1,261 @@
+import os
+import mmap
+import zlib
+import struct
+from xmp_metadata import extract_xmp_metadata
+from fileio import is_path, open_file
+
+# Pembaca metadata header-only: hanya membaca segmen/chunk sebelum data gambar (SOS/IDAT)
+XMP_KEY = "XML:com.adobe.xmp"
+JPEG_XMP_HEADER = b"http://ns.adobe.com/xap/1.0/\x00"
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+JPEG_SOS = 0xDA
+JPEG_APP1 = 0xE1
+# SOF0..SOF15 kecuali DHT (C4), JPG (C8) dan DAC (CC)
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+JPEG_MODES = {1: "L", 3: "RGB", 4: "CMYK"}
+PNG_MODES = {0: "L", 2: "RGB", 3: "P", 4: "LA", 6: "RGBA"}
+WEBP_ALPHA_FLAG = 0x10
+AVIF_BRANDS = (b"avif", b"avis")
+XMP_MIME = b"application/rdf+xml"
+
+
+def _read_jpeg(f, header):
+    f.seek(2)
+    while True:
+        prefix = f.read(2)
+        if len(prefix) < 2 or prefix[0] != 0xFF:
+            break
+        marker = prefix[1]
+        if marker == 0xFF:  # padding
+            f.seek(-1, os.SEEK_CUR)
+            continue
+        if marker == JPEG_SOS:
+            break
+        length = struct.unpack(">H", f.read(2))[0] - 2
+        if marker == JPEG_APP1 and header["xmp"] is None:
+            payload = f.read(length)
+            if payload.startswith(JPEG_XMP_HEADER):
+                header["xmp"] = payload[len(JPEG_XMP_HEADER):]
+        elif marker in JPEG_SOF_MARKERS and header["size"] is None:
+            sof = f.read(length)
+            height, width = struct.unpack(">HH", sof[1:5])
+            header["size"] = (width, height)
+            header["mode"] = JPEG_MODES.get(sof[5])
+        else:
+            f.seek(length, os.SEEK_CUR)
+    return header
+
+
+def _decode_itxt(data):
+    keyword, rest = data.split(b"\x00", 1)
+    compressed, _method = rest[0], rest[1]
+    _lang, rest = rest[2:].split(b"\x00", 1)
+    _translated, text = rest.split(b"\x00", 1)
+    if compressed:
+        text = zlib.decompress(text)
+    return keyword.decode("latin-1"), text
+
+
+def _read_png(f, header):
+    f.seek(len(PNG_SIGNATURE))
+    while True:
+        chunk_header = f.read(8)
+        if len(chunk_header) < 8:
+            break
+        length, chunk_type = struct.unpack(">I4s", chunk_header)
+        if chunk_type in (b"IDAT", b"IEND"):
+            break
+        if chunk_type in (b"IHDR", b"tEXt", b"zTXt", b"iTXt"):
+            data = f.read(length)
+            f.seek(4, os.SEEK_CUR)  # CRC
+        else:
+            f.seek(length + 4, os.SEEK_CUR)
+            continue
+
+        if chunk_type == b"IHDR":
+            width, height, bit_depth, color_type = struct.unpack(">IIBB", data[:10])
+            header["size"] = (width, height)
+            header["mode"] = PNG_MODES.get(color_type)
+            if bit_depth == 16 and color_type == 0:
+                header["mode"] = "I;16"
+        elif chunk_type == b"tEXt":
+            key, value = data.split(b"\x00", 1)
+            header["text"][key.decode("latin-1")] = value.decode("latin-1")
+        elif chunk_type == b"zTXt":
+            key, value = data.split(b"\x00", 1)
+            header["text"][key.decode("latin-1")] = zlib.decompress(value[1:]).decode("latin-1")
+        else:
+            key, value = _decode_itxt(data)
+            if key == XMP_KEY:
+                header["xmp"] = value
+            else:
+                header["text"][key] = value.decode("utf-8", errors="ignore")
+    return header
+
+
+def _read_webp(f, header):
+    # Chunk RIFF: ukuran dari VP8X/VP8/VP8L, XMP dari chunk "XMP " (biasanya setelah data gambar; di-seek)
+    f.seek(12)
+    while True:
+        chunk_header = f.read(8)
+        if len(chunk_header) < 8:
+            break
+        chunk_type, length = struct.unpack("<4sI", chunk_header)
+        padded = length + (length & 1)
+        if chunk_type == b"XMP ":
+            header["xmp"] = f.read(length)
+            f.seek(padded - length, os.SEEK_CUR)
+            continue
+        if header["size"] is None and chunk_type in (b"VP8X", b"VP8 ", b"VP8L"):
+            data = f.read(min(length, 10))
+            f.seek(padded - len(data), os.SEEK_CUR)
+            if chunk_type == b"VP8X":
+                width = int.from_bytes(data[4:7], "little") + 1
+                height = int.from_bytes(data[7:10], "little") + 1
+                header["mode"] = "RGBA" if data[0] & WEBP_ALPHA_FLAG else "RGB"
+            elif chunk_type == b"VP8 ":
+                width, height = (value & 0x3FFF for value in struct.unpack("<HH", data[6:10]))
+                header["mode"] = "RGB"
+            else:
+                bits = int.from_bytes(data[1:5], "little")
+                width, height = (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+                header["mode"] = "RGBA" if bits >> 28 & 1 else "RGB"
+            header["size"] = (width, height)
+            continue
+        f.seek(padded, os.SEEK_CUR)
+    return header
+
+
+def _iter_boxes(f, end):
+    # (tipe, offset isi, akhir box) untuk box ISOBMFF di [posisi sekarang, end)
+    while end is None or f.tell() + 8 <= end:
+        box_header = f.read(8)
+        if len(box_header) < 8:
+            return
+        size, box_type = struct.unpack(">I4s", box_header)
+        start = f.tell()
+        if size == 1:
+            size = struct.unpack(">Q", f.read(8))[0]
+        elif size == 0:
+            f.seek(0, os.SEEK_END)
+            size = f.tell() - start + 8
+            f.seek(start)
+        box_end = start - 8 + size
+        yield box_type, f.tell(), box_end
+        f.seek(box_end)
+
+def _read_uint(data, pos, size):
+    return int.from_bytes(data[pos:pos + size], "big"), pos + size
+
+def _xmp_item_ids(iinf):
+    # Item "mime" dengan content type XMP dari box iinf (isi setelah version/flags)
+    version = iinf[0]
+    count, pos = _read_uint(iinf, 4, 2 if version == 0 else 4)
+    ids = set()
+    for _ in range(count):
+        size, box_type = struct.unpack(">I4s", iinf[pos:pos + 8])
+        entry = iinf[pos + 8:pos + size]
+        pos += size
+        if box_type != b"infe" or entry[0] < 2:
+            continue
+        item_id, cursor = _read_uint(entry, 4, 2 if entry[0] == 2 else 4)
+        item_type = entry[cursor + 2:cursor + 6]
+        name_end = entry.index(b"\x00", cursor + 6)
+        if item_type == b"mime" and entry[name_end + 1:].split(b"\x00")[0] == XMP_MIME:
+            ids.add(item_id)
+    return ids
+
+def _item_extents(iloc, item_ids):
+    # [(offset file, panjang)] item pertama di item_ids dari box iloc (construction_method 0 saja)
+    version = iloc[0]
+    offset_size, length_size = iloc[4] >> 4, iloc[4] & 0xF
+    base_offset_size, index_size = iloc[5] >> 4, (iloc[5] & 0xF if version in (1, 2) else 0)
+    count, pos = _read_uint(iloc, 6, 2 if version < 2 else 4)
+    for _ in range(count):
+        item_id, pos = _read_uint(iloc, pos, 2 if version < 2 else 4)
+        method = 0
+        if version in (1, 2):
+            method, pos = _read_uint(iloc, pos, 2)
+            method &= 0xF
+        pos += 2  # data_reference_index
+        base_offset, pos = _read_uint(iloc, pos, base_offset_size)
+        extent_count, pos = _read_uint(iloc, pos, 2)
+        extents = []
+        for _ in range(extent_count):
+            pos += index_size
+            offset, pos = _read_uint(iloc, pos, offset_size)
+            length, pos = _read_uint(iloc, pos, length_size)
+            extents.append((base_offset + offset, length))
+        if item_id in item_ids and method == 0:
+            return extents
+    return []
+
+def _read_avif(f, header):
+    # ISOBMFF: ukuran dari ispe, alpha dari auxC, XMP dari item "mime" yang ditunjuk iloc (di-seek)
+    f.seek(0)
+    for box_type, start, end in _iter_boxes(f, None):
+        if box_type != b"meta":
+            continue
+        f.seek(start + 4)  # version/flags
+        boxes = {}
+        for child_type, child_start, child_end in _iter_boxes(f, end):
+            if child_type in (b"iinf", b"iloc", b"iprp"):
+                f.seek(child_start)
+                boxes[child_type] = f.read(child_end - child_start)
+        properties = boxes.get(b"iprp", b"")
+        ispe = properties.find(b"ispe")
+        if ispe >= 0:
+            header["size"] = struct.unpack(">II", properties[ispe + 8:ispe + 16])
+            header["mode"] = "RGBA" if b"urn:mpeg:mpegB:cicp:systems:auxiliary:alpha" in properties else "RGB"
+        if b"iinf" in boxes and b"iloc" in boxes:
+            extents = _item_extents(boxes[b"iloc"], _xmp_item_ids(boxes[b"iinf"]))
+            parts = []
+            for offset, length in extents:
+                f.seek(offset)
+                parts.append(f.read(length))
+            header["xmp"] = b"".join(parts) or None
+        break
+    return header
+
+
+def _read_from(f):
+    header = {"format": None, "size": None, "mode": None, "xmp": None, "text": {}}
+    signature = f.read(8)
+    if signature.startswith(b"\xff\xd8"):
+        header["format"] = "JPEG"
+        return _read_jpeg(f, header)
+    if signature == PNG_SIGNATURE:
+        header["format"] = "PNG"
+        return _read_png(f, header)
+    if signature[:4] == b"RIFF" and f.read(4) == b"WEBP":
+        header["format"] = "WEBP"
+        return _read_webp(f, header)
+    if signature[4:8] == b"ftyp" and f.read(4) in AVIF_BRANDS:
+        header["format"] = "AVIF"
+        return _read_avif(f, header)
+    return header
+
+
+def read_header(path, use_mmap=False):
+    # format, size, mode, xmp (bytes) dan text chunk PNG tanpa decode pixel.
+    # use_mmap=True: hanya halaman yang disentuh yang dibaca dari disk (cocok untuk scan massal)
+    # path boleh file object biner (mis. BytesIO dari pipeline async), mmap diabaikan
+    with open_file(path, "rb") as f:
+        if not use_mmap or not is_path(path):
+            return _read_from(f)
+        if os.fstat(f.fileno()).st_size == 0:
+            return _read_from(f)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return _read_from(mm)
+
+
+def read_xmp(path, use_mmap=False):
+    return read_header(path, use_mmap)["xmp"]
+
+
+def read_metadata(path, use_mmap=False):
+    # (title, description, keywords) dari XMP di header file
+    xmp = read_xmp(path, use_mmap)
+    return extract_xmp_metadata(xmp) if xmp else ("", "", [])